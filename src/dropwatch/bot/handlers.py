@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import json
 import logging
-import re
 
 from aiogram import F, Router
 from aiogram.filters import Command, StateFilter
@@ -43,7 +42,7 @@ from dropwatch.common.formatting import format_price
 from dropwatch.common.secrets import decode_secret, encode_secret
 from dropwatch.common.single_tenant import single_tenant_enabled
 from dropwatch.db import crud
-from dropwatch.db.database import get_sessionmaker
+from dropwatch.db.database import unit_of_work
 from dropwatch.db.models import Condition, Delivery, SellerType, TaskStatus
 
 
@@ -55,10 +54,11 @@ LEGACY_TASKS_TEXTS = {"📋 Мои задачи", "Мои задачи", "Мои
 LEGACY_SETTINGS_TEXTS = {"⚙ Настройки", "Настройки"}
 LEGACY_FAVORITES_TEXTS = {"⭐ Избранное", "Избранное"}
 LEGACY_HELP_TEXTS = {"❓ Помощь", "Помощь", "Инструкция"}
+_ASCII_DIGITS = frozenset("0123456789")
 
 
 def _parse_int(text: str) -> int | None:
-    value = re.sub(r"[^0-9]", "", text or "")
+    value = "".join(filter(_ASCII_DIGITS.__contains__, text or ""))
     if not value:
         return None
     try:
@@ -220,8 +220,7 @@ async def _update_user_task(session, tg_id: int, task_id: int, **kwargs) -> bool
 async def start(message: Message, state: FSMContext) -> None:
     logger.info("Command /start: user_id=%s chat_id=%s", message.from_user.id, message.chat.id)
     await state.clear()
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, monitor_settings = await _get_or_create_user_settings(session, message.from_user.id)
         missing_antiban = _missing_antiban_fields(monitor_settings)
     await message.answer(START_TEXT, reply_markup=main_menu())
@@ -247,8 +246,7 @@ async def set_proxy_start(message: Message, state: FSMContext) -> None:
 async def show_status(message: Message, state: FSMContext) -> None:
     logger.info("Command /status: user_id=%s", message.from_user.id)
     await state.clear()
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, monitor_settings = await _get_or_create_user_settings(session, message.from_user.id)
         tasks = await crud.list_tasks(session, user.id)
     await message.answer(_format_status_text(user, monitor_settings, tasks), reply_markup=main_menu())
@@ -279,8 +277,7 @@ async def set_proxy_finish(message: Message, state: FSMContext) -> None:
             return
         proxy_value = raw
 
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, _ = await _get_or_create_user_settings(session, message.from_user.id)
         await crud.update_settings(session, user.id, proxy_b64=encode_secret(proxy_value))
     await state.clear()
@@ -318,8 +315,7 @@ async def set_proxy_change_url_finish(message: Message, state: FSMContext) -> No
             return
         value = raw
 
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, _ = await _get_or_create_user_settings(session, message.from_user.id)
         await crud.update_settings(session, user.id, proxy_change_url_b64=encode_secret(value))
     await state.clear()
@@ -329,8 +325,7 @@ async def set_proxy_change_url_finish(message: Message, state: FSMContext) -> No
 @router.message(Command("start_monitor"))
 async def start_monitor(message: Message) -> None:
     logger.info("Command /start_monitor: user_id=%s", message.from_user.id)
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, monitor_settings = await _get_or_create_user_settings(session, message.from_user.id)
         tasks = await crud.list_tasks(session, user.id)
         missing = _missing_antiban_fields(monitor_settings)
@@ -351,8 +346,7 @@ async def start_monitor(message: Message) -> None:
 
 @router.callback_query(F.data == "quickcfg:start")
 async def quickcfg_start_monitor(callback: CallbackQuery) -> None:
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, monitor_settings = await _get_or_create_user_settings(session, callback.from_user.id)
         tasks = await crud.list_tasks(session, user.id)
         missing = _missing_antiban_fields(monitor_settings)
@@ -376,8 +370,7 @@ async def quickcfg_start_monitor(callback: CallbackQuery) -> None:
 @router.message(Command("stop_monitor"))
 async def stop_monitor(message: Message) -> None:
     logger.info("Command /stop_monitor: user_id=%s", message.from_user.id)
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, _ = await _get_or_create_user_settings(session, message.from_user.id)
         await crud.update_settings(session, user.id, monitor_enabled=False)
     await message.answer("Мониторинг остановлен. Все радары сохранены.")
@@ -385,8 +378,7 @@ async def stop_monitor(message: Message) -> None:
 
 @router.callback_query(F.data == "quickcfg:stop")
 async def quickcfg_stop_monitor(callback: CallbackQuery) -> None:
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, _ = await _get_or_create_user_settings(session, callback.from_user.id)
         await crud.update_settings(session, user.id, monitor_enabled=False)
     await callback.message.answer("Мониторинг остановлен. Все радары сохранены.")
@@ -458,8 +450,7 @@ async def set_filters_ignore_promotion(message: Message, state: FSMContext) -> N
         await message.answer("Ответь `yes` или `no`.")
         return
     data = await state.get_data()
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, _ = await _get_or_create_user_settings(session, message.from_user.id)
         await crud.update_settings(
             session,
@@ -575,8 +566,7 @@ async def set_link_keywords_black(message: Message, state: FSMContext) -> None:
     black_words = _split_words(raw)
     data = await state.get_data()
 
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user, monitor_settings = await _get_or_create_user_settings(session, message.from_user.id)
         interval = _default_interval_sec(user, monitor_settings)
         keyword_text = " ".join(data.get("keywords_white") or [])
@@ -717,8 +707,7 @@ async def quick_search_max_price(message: Message, state: FSMContext) -> None:
         if price_max is None:
             await message.answer("Введи число, например 5000")
             return
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, message.from_user.id)
         if not user:
             logger.warning("Quick max price: user not found user_id=%s", message.from_user.id)
@@ -1000,8 +989,7 @@ async def _show_review(message: Message, state: FSMContext) -> None:
 async def create_task_confirm(callback: CallbackQuery, state: FSMContext) -> None:
     logger.info("CreateTask.confirm: user_id=%s", callback.from_user.id)
     data = await state.get_data()
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_or_create_user(
             session,
             tg_id=callback.from_user.id,
@@ -1065,8 +1053,7 @@ async def create_task_cancel(callback: CallbackQuery, state: FSMContext) -> None
 @router.message(F.text == MENU_TASKS)
 async def list_tasks(message: Message) -> None:
     logger.info("List tasks: user_id=%s chat_id=%s", message.from_user.id, message.chat.id)
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_or_create_user(
             session,
             tg_id=message.from_user.id,
@@ -1092,8 +1079,7 @@ async def list_tasks_legacy(message: Message) -> None:
 async def task_details(callback: CallbackQuery) -> None:
     logger.info("Task details: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, callback.from_user.id)
         if not user:
             await callback.answer("Пользователь не найден")
@@ -1125,8 +1111,7 @@ async def noop_callback(callback: CallbackQuery) -> None:
 async def task_pause(callback: CallbackQuery) -> None:
     logger.info("Task pause: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, task_id)
         if not task:
             await callback.answer("Радар не найден")
@@ -1139,8 +1124,7 @@ async def task_pause(callback: CallbackQuery) -> None:
 async def task_resume(callback: CallbackQuery) -> None:
     logger.info("Task resume: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, task_id)
         if not task:
             await callback.answer("Радар не найден")
@@ -1153,8 +1137,7 @@ async def task_resume(callback: CallbackQuery) -> None:
 async def task_stop(callback: CallbackQuery) -> None:
     logger.info("Task stop: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, task_id)
         if not task:
             await callback.answer("Радар не найден")
@@ -1167,8 +1150,7 @@ async def task_stop(callback: CallbackQuery) -> None:
 async def task_clear(callback: CallbackQuery) -> None:
     logger.info("Task clear: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, task_id)
         if not task:
             await callback.answer("Радар не найден")
@@ -1181,8 +1163,7 @@ async def task_clear(callback: CallbackQuery) -> None:
 async def task_delete(callback: CallbackQuery) -> None:
     logger.info("Task delete: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, task_id)
         if not task:
             await callback.answer("Радар не найден")
@@ -1196,8 +1177,7 @@ async def task_delete(callback: CallbackQuery) -> None:
 async def task_interval(callback: CallbackQuery, state: FSMContext) -> None:
     logger.info("Task interval change: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, task_id)
         if not task:
             await callback.answer("Радар не найден")
@@ -1212,8 +1192,7 @@ async def task_interval(callback: CallbackQuery, state: FSMContext) -> None:
 async def task_edit_menu(callback: CallbackQuery, state: FSMContext) -> None:
     logger.info("Task edit menu: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, task_id)
         if not task:
             await callback.answer("Радар не найден")
@@ -1228,8 +1207,7 @@ async def task_edit_menu(callback: CallbackQuery, state: FSMContext) -> None:
 async def task_edit_price(callback: CallbackQuery, state: FSMContext) -> None:
     logger.info("Task edit price: user_id=%s data=%s", callback.from_user.id, callback.data)
     task_id = int(callback.data.split(":", 1)[1])
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, task_id)
         if not task:
             await callback.answer("Радар не найден")
@@ -1258,8 +1236,7 @@ async def edit_task_field(callback: CallbackQuery, state: FSMContext) -> None:
         await callback.answer()
         return
     if field == "sort":
-        session_maker = get_sessionmaker()
-        async with session_maker() as session:
+        async with unit_of_work() as session:
             task = await _get_user_task(session, callback.from_user.id, int(task_id))
             if task:
                 await crud.update_task(session, task.id, sort_new_first=not task.sort_new_first)
@@ -1303,8 +1280,7 @@ async def edit_task_text_value(message: Message, state: FSMContext) -> None:
         }
         update_kwargs = {mapping.get(field, field): value}
 
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         updated = await _update_user_task(session, message.from_user.id, int(task_id), **update_kwargs)
     if not updated:
         await message.answer("Радар не найден", reply_markup=main_menu())
@@ -1324,8 +1300,7 @@ async def edit_interval_choice(callback: CallbackQuery, state: FSMContext) -> No
         await callback.message.edit_text("Введи интервал в минутах")
         await callback.answer()
         return
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         updated = await _update_user_task(session, callback.from_user.id, int(task_id), interval_sec=int(value))
     if not updated:
         await state.clear()
@@ -1344,8 +1319,7 @@ async def edit_interval_custom(message: Message, state: FSMContext) -> None:
     if value is None:
         await message.answer("Введи число минут, например 2")
         return
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         updated = await _update_user_task(session, message.from_user.id, int(task_id), interval_sec=value * 60)
     if not updated:
         await message.answer("Радар не найден", reply_markup=main_menu())
@@ -1369,8 +1343,7 @@ async def edit_price_max(message: Message, state: FSMContext) -> None:
         if price_max is None:
             await message.answer("Введи число, например 5000")
             return
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         updated = await _update_user_task(session, message.from_user.id, int(task_id), price_max=price_max)
     if not updated:
         await message.answer("Радар не найден", reply_markup=main_menu())
@@ -1386,8 +1359,7 @@ async def edit_condition(callback: CallbackQuery, state: FSMContext) -> None:
     value = callback.data.split(":", 1)[1]
     data = await state.get_data()
     task_id = data.get("task_id")
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         updated = await _update_user_task(session, callback.from_user.id, int(task_id), condition=Condition(value))
     if not updated:
         await state.clear()
@@ -1403,8 +1375,7 @@ async def edit_delivery(callback: CallbackQuery, state: FSMContext) -> None:
     value = callback.data.split(":", 1)[1]
     data = await state.get_data()
     task_id = data.get("task_id")
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         updated = await _update_user_task(session, callback.from_user.id, int(task_id), delivery=Delivery(value))
     if not updated:
         await state.clear()
@@ -1420,8 +1391,7 @@ async def edit_seller(callback: CallbackQuery, state: FSMContext) -> None:
     value = callback.data.split(":", 1)[1]
     data = await state.get_data()
     task_id = data.get("task_id")
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         updated = await _update_user_task(session, callback.from_user.id, int(task_id), seller_type=SellerType(value))
     if not updated:
         await state.clear()
@@ -1457,8 +1427,7 @@ async def settings_choice(callback: CallbackQuery, state: FSMContext) -> None:
         await state.set_state(SettingsState.notify_limit)
         await callback.message.edit_text("Лимит уведомлений в час (число или Пропустить)")
     elif choice == "events":
-        session_maker = get_sessionmaker()
-        async with session_maker() as session:
+        async with unit_of_work() as session:
             user = await crud.get_user_by_tg(session, callback.from_user.id)
         await callback.message.edit_text(
             "События:",
@@ -1471,8 +1440,7 @@ async def settings_choice(callback: CallbackQuery, state: FSMContext) -> None:
 async def settings_events_toggle(callback: CallbackQuery) -> None:
     logger.info("Settings events toggle: user_id=%s data=%s", callback.from_user.id, callback.data)
     choice = callback.data.split(":", 1)[1]
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, callback.from_user.id)
         if not user:
             await callback.answer("Пользователь не найден")
@@ -1502,8 +1470,7 @@ async def settings_interval(callback: CallbackQuery, state: FSMContext) -> None:
         await callback.answer()
         return
     interval_sec = int(value)
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, callback.from_user.id)
         if user:
             await _save_default_interval(session, user.id, interval_sec)
@@ -1518,8 +1485,7 @@ async def settings_interval_custom(message: Message, state: FSMContext) -> None:
     if value is None:
         await message.answer("Введи число минут, например 2")
         return
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, message.from_user.id)
         if user:
             await _save_default_interval(session, user.id, value * 60)
@@ -1554,8 +1520,7 @@ async def _save_quiet_hours(message: Message, start: str | None, end: str | None
     logger.info(
         "Save quiet hours: user_id=%s start=%s end=%s", message.from_user.id, start, end
     )
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, message.from_user.id)
         if user:
             await crud.update_user_settings(session, user.id, quiet_hours_start=start, quiet_hours_end=end)
@@ -1572,8 +1537,7 @@ async def settings_limit(message: Message, state: FSMContext) -> None:
         if limit is None:
             await message.answer("Введи число, например 20")
             return
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, message.from_user.id)
         if user:
             await crud.update_user_settings(session, user.id, notify_limit_per_hour=limit)
@@ -1584,21 +1548,19 @@ async def settings_limit(message: Message, state: FSMContext) -> None:
 @router.message(F.text == MENU_FAVORITES)
 async def favorites_list(message: Message) -> None:
     logger.info("Favorites list: user_id=%s", message.from_user.id)
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, message.from_user.id)
         if not user:
             await message.answer("Сначала нажми /start")
             return
-        favorites = await crud.list_favorites(session, user.id)
-    if not favorites:
+        lines = ["⭐ Избранное:"]
+        async for fav in crud.iter_favorites(session, user.id, limit=20):
+            lines.append(f"• {fav.title or 'Объявление'} — {format_price(fav.price)} ₽")
+            if fav.url:
+                lines.append(fav.url)
+    if len(lines) == 1:
         await message.answer("Избранное пусто")
         return
-    lines = ["⭐ Избранное:"]
-    for fav in favorites[:20]:
-        lines.append(f"• {fav.title or 'Объявление'} — {format_price(fav.price)} ₽")
-        if fav.url:
-            lines.append(fav.url)
     await message.answer("\n".join(lines))
 
 
@@ -1611,8 +1573,7 @@ async def favorites_list_legacy(message: Message) -> None:
 async def mark_seen(callback: CallbackQuery) -> None:
     logger.info("Mark seen: user_id=%s data=%s", callback.from_user.id, callback.data)
     _, task_id, listing_id = callback.data.split(":", 2)
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         task = await _get_user_task(session, callback.from_user.id, int(task_id))
         if not task:
             await callback.answer("Радар не найден")
@@ -1625,8 +1586,7 @@ async def mark_seen(callback: CallbackQuery) -> None:
 async def add_favorite(callback: CallbackQuery) -> None:
     logger.info("Add favorite: user_id=%s data=%s", callback.from_user.id, callback.data)
     _, task_id, listing_id = callback.data.split(":", 2)
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_user_by_tg(session, callback.from_user.id)
         if not user:
             await callback.answer("Сначала нажми /start")
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
 
 from dropwatch.bot.texts import (
@@ -206,6 +208,9 @@ def events_keyboard(event_new: bool, event_price: bool, event_update: bool) -> I
     )
 
 
+# Аргументы — простые значения, разметку после сборки никто не меняет: повторные отправки
+# того же объявления (снижение цены, обновление) берут готовый объект.
+@lru_cache(maxsize=4096)
 def listing_actions_keyboard(task_id: int, listing_id: str, url: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -1,19 +1,23 @@
 from __future__ import annotations
 
+from functools import lru_cache
 import re
 from typing import Any
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import ParseResult, parse_qs, urlparse
 
 
 _PRICE_MIN_KEYS = ("pmin", "price_min", "priceMin", "minPrice", "price_from")
 _PRICE_MAX_KEYS = ("pmax", "price_max", "priceMax", "maxPrice", "price_to")
 _RADIUS_KEYS = ("radius", "searchRadius", "r")
 _QUERY_KEYS = ("q", "query", "text")
+_ASCII_DIGITS = frozenset("0123456789")
+_SLUG_TAIL_RE = re.compile(r"-ASg.*$")
+_COORD_RE = re.compile(r"^-?\d+(?:\.\d+)?,-?\d+(?:\.\d+)?$")
 
 
 def is_avito_url(url: str) -> bool:
     try:
-        parsed = urlparse(url)
+        parsed, _ = _parse_cached(url)
     except ValueError:
         return False
     if parsed.scheme not in {"http", "https"}:
@@ -22,8 +26,7 @@ def is_avito_url(url: str) -> bool:
 
 
 def extract_task_name(url: str) -> str | None:
-    parsed = urlparse(url)
-    params = parse_qs(parsed.query)
+    parsed, params = _parse_cached(url)
     query = _first_param(params, _QUERY_KEYS)
     if query:
         return query[:200]
@@ -32,8 +35,7 @@ def extract_task_name(url: str) -> str | None:
 
 
 def parse_search_url(url: str) -> dict[str, Any]:
-    parsed = urlparse(url)
-    params = parse_qs(parsed.query)
+    parsed, params = _parse_cached(url)
     keywords = _first_param(params, _QUERY_KEYS)
     if not keywords:
         keywords = _extract_slug(parsed.path)
@@ -56,8 +58,20 @@ def parse_search_url(url: str) -> dict[str, Any]:
     return result
 
 
+@lru_cache(maxsize=2048)
+def _parse_cached(url: str) -> tuple[ParseResult, dict[str, list[str]]]:
+    # Результат общий для всех вызовов: params только читаем, не изменяем.
+    parsed = urlparse(url)
+    return parsed, parse_qs(parsed.query)
+
+
+@lru_cache(maxsize=2048)
+def _path_segments(path: str) -> tuple[str, ...]:
+    return tuple(segment for segment in path.split("/") if segment)
+
+
 def _extract_path_parts(path: str) -> tuple[str | None, str | None]:
-    segments = [segment for segment in path.split("/") if segment]
+    segments = _path_segments(path)
     if not segments:
         return None, None
     city = segments[0]
@@ -66,11 +80,11 @@ def _extract_path_parts(path: str) -> tuple[str | None, str | None]:
 
 
 def _extract_slug(path: str) -> str | None:
-    segments = [segment for segment in path.split("/") if segment]
+    segments = _path_segments(path)
     if not segments:
         return None
     slug = segments[-1]
-    slug = re.sub(r"-ASg.*$", "", slug)
+    slug = _SLUG_TAIL_RE.sub("", slug)
     slug = slug.replace("_", " ")
     return slug or None
 
@@ -90,11 +104,11 @@ def _parse_int(value: str | None) -> int | None:
     if not value:
         return None
     try:
-        cleaned = re.sub(r"[^0-9]", "", value)
+        cleaned = "".join(filter(_ASCII_DIGITS.__contains__, value))
         return int(cleaned) if cleaned else None
     except ValueError:
         return None
 
 
 def _looks_coords(value: str) -> bool:
-    return bool(re.match(r"^-?\d+(?:\.\d+)?,-?\d+(?:\.\d+)?$", value))
+    return bool(_COORD_RE.match(value))
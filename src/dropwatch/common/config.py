@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+from functools import cached_property
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 
 class Settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True, extra="ignore")
 
     telegram_token: str = Field(alias="TELEGRAM_TOKEN")
     owner_tg_id: int | None = Field(default=None, alias="OWNER_TG_ID")
@@ -14,9 +16,12 @@ class Settings(BaseSettings):
     default_timezone: str = Field(default="Europe/Moscow", alias="DEFAULT_TIMEZONE")
     default_task_interval_sec: int = Field(default=60, alias="DEFAULT_TASK_INTERVAL_SEC")
     scheduler_tick_sec: int = Field(default=30, alias="SCHEDULER_TICK_SEC")
+    tick_batch_size: int = Field(default=100, alias="TICK_BATCH_SIZE")
     global_poll_interval_sec: int = Field(default=120, alias="GLOBAL_POLL_INTERVAL_SEC")
     aggregate_threshold: int = Field(default=3, alias="AGGREGATE_THRESHOLD")
     min_request_gap_sec: int = Field(default=30, alias="MIN_REQUEST_GAP_SEC")
+    request_burst: int = Field(default=1, alias="REQUEST_BURST")
+    fetch_concurrency: int = Field(default=5, alias="FETCH_CONCURRENCY")
 
     fetcher: str = Field(default="avito_search", alias="FETCHER")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
@@ -33,6 +38,7 @@ class Settings(BaseSettings):
     avito_impersonate: str = Field(default="chrome", alias="AVITO_IMPERSONATE")
     avito_parse_views: bool = Field(default=False, alias="AVITO_PARSE_VIEWS")
     avito_views_delay_sec: float = Field(default=0.5, alias="AVITO_VIEWS_DELAY_SEC")
+    avito_views_concurrency: int = Field(default=5, alias="AVITO_VIEWS_CONCURRENCY")
     avito_ignore_reserved: bool = Field(default=False, alias="AVITO_IGNORE_RESERVED")
     avito_ignore_promotion: bool = Field(default=False, alias="AVITO_IGNORE_PROMOTION")
     avito_max_age_sec: int = Field(default=0, alias="AVITO_MAX_AGE_SEC")
@@ -43,5 +49,37 @@ class Settings(BaseSettings):
 
     mock_data_path: str = Field(default="./mock_listings.json", alias="MOCK_DATA_PATH")
 
+    @cached_property
+    def seller_blacklist_set(self) -> frozenset[str]:
+        return frozenset(_csv_items(self.avito_seller_blacklist))
+
+    @cached_property
+    def keywords_whitelist_phrases(self) -> tuple[str, ...]:
+        return tuple(item.lower() for item in _csv_items(self.avito_keywords_whitelist))
+
+    @cached_property
+    def keywords_blacklist_phrases(self) -> tuple[str, ...]:
+        return tuple(item.lower() for item in _csv_items(self.avito_keywords_blacklist))
+
+
+def _csv_items(value: str | None) -> list[str]:
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
 
-settings = Settings()
+def __getattr__(name: str):
+    # settings создаем при первом обращении, а не при импорте модуля.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Iterable
+from itertools import islice
+from typing import Iterable, Sequence
 
 from dropwatch.common.types import Listing
 
@@ -29,26 +30,13 @@ def format_listing_message(
     published_source = listing.published_at or detected_at
     published_at = _format_published_at(published_source, detected_at)
     price_text = f"{format_price(listing.price)} ₽" if listing.price is not None else "—"
-    lines = [
-        header,
-        "",
-        f"📡 Радар: {task_name}",
-        f"📌 {listing.title}",
-    ]
-    if extra_lines:
-        lines.extend(extra_lines)
-    if listing.category:
-        lines.append(f"🏷️ {listing.category}")
-    lines.extend(
-        [
-            f"💰 {price_text}",
-            f"📍 {location}",
-            f"🕒 Опубликовано: {published_at}",
-        ]
+    extra = ("\n" + "\n".join(extra_lines)) if extra_lines else ""
+    category = f"\n🏷️ {listing.category}" if listing.category else ""
+    link = f"\n\n🔗 {listing.url}" if listing.url else ""
+    return (
+        f"{header}\n\n📡 Радар: {task_name}\n📌 {listing.title}{extra}{category}"
+        f"\n💰 {price_text}\n📍 {location}\n🕒 Опубликовано: {published_at}{link}"
     )
-    if listing.url:
-        lines.extend(["", f"🔗 {listing.url}"])
-    return "\n".join(lines)
 
 
 def build_listing_summary(listing: Listing, max_len: int = 140) -> str | None:
@@ -71,13 +59,10 @@ def format_task_filters(filters: dict[str, str | int | None]) -> str:
 
 
 def chunked(iterable: Iterable, size: int) -> list[list]:
-    chunk: list = []
+    if isinstance(iterable, Sequence):
+        return [list(iterable[start : start + size]) for start in range(0, len(iterable), size)]
+    iterator = iter(iterable)
     batches: list[list] = []
-    for item in iterable:
-        chunk.append(item)
-        if len(chunk) >= size:
-            batches.append(chunk)
-            chunk = []
-    if chunk:
-        batches.append(chunk)
+    while batch := list(islice(iterator, size)):
+        batches.append(batch)
     return batches
@@ -12,4 +12,11 @@ def listing_hash(title: str | None, price: int | None, location: str | None, url
             url or "",
         ]
     )
-    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def listing_hash_changed(new_hash: str, old_hash: str | None) -> bool:
+    # Старые sha256-хэши (64 символа) с новыми не сравниваем, иначе все объявления разом станут "обновленными".
+    if old_hash and len(old_hash) != len(new_hash):
+        return False
+    return new_hash != old_hash
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 import json
 import re
+from typing import Callable, Iterable
 
 from dropwatch.common.config import settings
+from dropwatch.common.types import Listing
 
 
 _WORD_RE = re.compile(r"[\w\-]+", re.UNICODE)
@@ -19,45 +23,63 @@ def _extract_words(text: str) -> list[str]:
     return _WORD_RE.findall(_normalize(text))
 
 
-def _match_keywords(text: str, keywords: str | None) -> bool:
-    if not keywords:
-        return True
-    tokens = _extract_words(keywords)
-    if not tokens:
-        return True
-    haystack = _normalize(text)
-    return all(token in haystack for token in tokens)
+@dataclass(frozen=True, slots=True)
+class _TextRules:
+    allow: re.Pattern[str] | None
+    deny: re.Pattern[str] | None
+    required: tuple[str, ...]
 
+    def matches(self, haystack: str) -> bool:
+        if self.allow is not None and not self.allow.search(haystack):
+            return False
+        if self.deny is not None and self.deny.search(haystack):
+            return False
+        return all(token in haystack for token in self.required)
 
-def _match_minus_words(text: str, minus_words: str | None) -> bool:
-    if not minus_words:
-        return True
-    tokens = _extract_words(minus_words)
-    if not tokens:
-        return True
-    haystack = _normalize(text)
-    return not any(token in haystack for token in tokens)
+
+def _any_of(phrases: tuple[str, ...] | list[str]) -> re.Pattern[str] | None:
+    if not phrases:
+        return None
+    return re.compile("|".join(re.escape(phrase) for phrase in dict.fromkeys(phrases)))
+
+
+@lru_cache(maxsize=256)
+def _compile_text_rules(
+    whitelist: tuple[str, ...],
+    blacklist: tuple[str, ...],
+    keywords: str | None,
+    minus_keywords: str | None,
+) -> _TextRules:
+    # Все "хотя бы одно" правила сводим в одну альтернативу: один проход по тексту вместо цикла по фразам.
+    deny = list(blacklist)
+    deny.extend(_extract_words(minus_keywords or ""))
+    return _TextRules(
+        allow=_any_of(whitelist),
+        deny=_any_of(deny),
+        required=tuple(dict.fromkeys(_extract_words(keywords or ""))),
+    )
 
 
 def matches_task(task, listing, monitor_settings=None) -> bool:
-    text = f"{listing.title or ''} {listing.description or ''}"
-    whitelist_csv = settings.avito_keywords_whitelist
-    blacklist_csv = settings.avito_keywords_blacklist
+    return compile_task_matcher(task, monitor_settings)(listing)
+
+
+def filter_matching(task, listings: Iterable[Listing], monitor_settings=None) -> list[Listing]:
+    matcher = compile_task_matcher(task, monitor_settings)
+    return [listing for listing in listings if matcher(listing)]
+
+
+def compile_task_matcher(task, monitor_settings=None) -> Callable[[Listing], bool]:
+    # Фильтры радара разрешаем один раз, дальше проверка объявлений идет по локальным значениям.
+    whitelist = settings.keywords_whitelist_phrases
+    blacklist = settings.keywords_blacklist_phrases
     user_whitelist = _json_list(getattr(monitor_settings, "keywords_white_json", None))
     user_blacklist = _json_list(getattr(monitor_settings, "keywords_black_json", None))
     if user_whitelist:
-        whitelist_csv = ",".join(user_whitelist)
+        whitelist = _lower_phrases(user_whitelist)
     if user_blacklist:
-        blacklist_csv = ",".join(user_blacklist)
-
-    if whitelist_csv and not _match_global_whitelist(text, whitelist_csv):
-        return False
-    if blacklist_csv and _match_global_blacklist(text, blacklist_csv):
-        return False
-    if not _match_keywords(text, task.keywords):
-        return False
-    if not _match_minus_words(text, task.minus_keywords):
-        return False
+        blacklist = _lower_phrases(user_blacklist)
+    rules = _compile_text_rules(whitelist, blacklist, task.keywords, task.minus_keywords)
 
     min_price = task.price_min
     max_price = task.price_max
@@ -67,26 +89,14 @@ def matches_task(task, listing, monitor_settings=None) -> bool:
         if max_price is None:
             max_price = getattr(monitor_settings, "max_price", None)
 
-    if listing.price is not None:
-        if min_price is not None and listing.price < min_price:
-            return False
-        if max_price is not None and listing.price > max_price:
-            return False
-
+    city_filter: str | None = None
     if task.city:
         city_value = task.city.strip()
-        if not (city_value.lower().startswith("gps:") or _COORD_RE.match(city_value)):
-            if listing.location:
-                if city_value.lower() not in listing.location.lower():
-                    return False
-            # if location missing, мягко пропускаем
-    if settings.avito_geo_filter and listing.location:
-        if settings.avito_geo_filter.lower() not in listing.location.lower():
-            return False
-
-    if task.category and getattr(listing, "category", None):
-        if task.category.lower() not in listing.category.lower():
-            return False
+        city_lower = city_value.lower()
+        if not (city_lower.startswith("gps:") or _COORD_RE.match(city_value)):
+            city_filter = city_lower
+    geo_filter = settings.avito_geo_filter.lower() if settings.avito_geo_filter else None
+    category_filter = task.category.lower() if task.category else None
 
     ignore_reserved = settings.avito_ignore_reserved
     ignore_promotion = settings.avito_ignore_promotion
@@ -95,36 +105,61 @@ def matches_task(task, listing, monitor_settings=None) -> bool:
         ignore_reserved = bool(getattr(monitor_settings, "ignore_reserv", ignore_reserved))
         ignore_promotion = bool(getattr(monitor_settings, "ignore_promotion", ignore_promotion))
         max_age_sec = int(getattr(monitor_settings, "max_age", max_age_sec) or 0)
-
-    if ignore_reserved and getattr(listing, "is_reserved", False):
-        return False
-    if ignore_promotion and getattr(listing, "is_promotion", False):
-        return False
-
-    if settings.avito_seller_blacklist and getattr(listing, "seller_id", None):
-        blacklist = _split_csv(settings.avito_seller_blacklist)
-        if listing.seller_id in blacklist:
+    seller_blacklist = settings.seller_blacklist_set
+
+    condition = task.condition if task.condition and task.condition != "any" else None
+    delivery = task.delivery if task.delivery and task.delivery != "any" else None
+    seller_type = task.seller_type if task.seller_type and task.seller_type != "any" else None
+    now = datetime.utcnow()
+
+    def matcher(listing: Listing) -> bool:
+        # Сначала дешевые O(1) проверки, отсеивающие основную массу; поиск по тексту — последним.
+        price = listing.price
+        if price is not None:
+            if min_price is not None and price < min_price:
+                return False
+            if max_price is not None and price > max_price:
+                return False
+
+        # Доп. поля (если источник их поддерживает)
+        if condition and listing.condition and listing.condition != condition:
             return False
-
-    if max_age_sec > 0 and getattr(listing, "published_at", None):
-        age_sec = (datetime.utcnow() - listing.published_at).total_seconds()
-        if age_sec > max_age_sec:
+        if delivery and listing.delivery and listing.delivery != delivery:
+            return False
+        if seller_type and listing.seller_type and listing.seller_type != seller_type:
             return False
 
-    # Доп. поля (если источник их поддерживает)
-    if getattr(listing, "condition", None) and task.condition and task.condition != "any":
-        if listing.condition != task.condition:
+        if ignore_reserved and listing.is_reserved:
+            return False
+        if ignore_promotion and listing.is_promotion:
             return False
 
-    if getattr(listing, "delivery", None) and task.delivery and task.delivery != "any":
-        if listing.delivery != task.delivery:
+        if seller_blacklist and listing.seller_id and listing.seller_id in seller_blacklist:
             return False
 
-    if getattr(listing, "seller_type", None) and task.seller_type and task.seller_type != "any":
-        if listing.seller_type != task.seller_type:
+        if max_age_sec > 0 and listing.published_at:
+            if (now - listing.published_at).total_seconds() > max_age_sec:
+                return False
+
+        location = (listing.location or "").lower()
+        # if location missing, мягко пропускаем
+        if city_filter and location and city_filter not in location:
+            return False
+        if geo_filter and location and geo_filter not in location:
             return False
 
-    return True
+        if category_filter and listing.category:
+            if category_filter not in listing.category.lower():
+                return False
+
+        # Одна строка в нижнем регистре на объявление; без описания склейка не нужна.
+        # strip() не нужен: фразы и слова уже без краевых пробелов.
+        title = listing.title or ""
+        description = listing.description
+        haystack = f"{title} {description}".lower() if description else title.lower()
+        return rules.matches(haystack)
+
+    return matcher
 
 
 def _split_csv(value: str | None) -> list[str]:
@@ -133,6 +168,11 @@ def _split_csv(value: str | None) -> list[str]:
     return [item.strip() for item in value.split(",") if item.strip()]
 
 
+def _lower_phrases(items: list[str]) -> tuple[str, ...]:
+    # Элемент из JSON может сам содержать запятые — режем так же, как CSV из .env.
+    return tuple(phrase.lower() for item in items for phrase in _split_csv(item))
+
+
 def _json_list(value: str | None) -> list[str]:
     if not value:
         return []
@@ -144,18 +184,3 @@ def _json_list(value: str | None) -> list[str]:
         return []
     return [str(item).strip() for item in raw if str(item).strip()]
 
-
-def _match_global_whitelist(text: str, whitelist: str) -> bool:
-    phrases = _split_csv(whitelist)
-    if not phrases:
-        return True
-    haystack = _normalize(text)
-    return any(phrase.lower() in haystack for phrase in phrases)
-
-
-def _match_global_blacklist(text: str, blacklist: str) -> bool:
-    phrases = _split_csv(blacklist)
-    if not phrases:
-        return False
-    haystack = _normalize(text)
-    return any(phrase.lower() in haystack for phrase in phrases)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import base64
+import binascii
 
 
 def encode_secret(value: str | None) -> str | None:
@@ -9,14 +9,14 @@ def encode_secret(value: str | None) -> str | None:
     text = value.strip()
     if not text:
         return None
-    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+    return binascii.b2a_base64(text.encode("utf-8"), newline=False).decode("ascii")
 
 
 def decode_secret(value_b64: str | None) -> str | None:
     if not value_b64:
         return None
     try:
-        decoded = base64.b64decode(value_b64.encode("ascii"), validate=True).decode("utf-8")
+        decoded = binascii.a2b_base64(value_b64, strict_mode=True).decode("utf-8")
     except Exception:
         return None
     decoded = decoded.strip()
@@ -4,7 +4,7 @@ import logging
 
 from dropwatch.common.config import settings
 from dropwatch.db import crud
-from dropwatch.db.database import get_sessionmaker
+from dropwatch.db.database import unit_of_work
 
 
 logger = logging.getLogger("single_tenant")
@@ -26,8 +26,7 @@ async def ensure_owner_user() -> None:
         logger.warning("OWNER_TG_ID is not set; single-tenant protection is disabled")
         return
 
-    session_maker = get_sessionmaker()
-    async with session_maker() as session:
+    async with unit_of_work() as session:
         user = await crud.get_or_create_user(
             session,
             tg_id=settings.owner_tg_id,
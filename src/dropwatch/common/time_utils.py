@@ -1,9 +1,16 @@
 from __future__ import annotations
 
 from datetime import datetime, time
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
 
+@lru_cache(maxsize=64)
+def _zone(timezone_str: str) -> ZoneInfo:
+    return ZoneInfo(timezone_str)
+
+
+@lru_cache(maxsize=256)
 def parse_time(value: str) -> time | None:
     try:
         parts = value.split(":")
@@ -21,7 +28,7 @@ def is_quiet_hours(now_utc: datetime, timezone_str: str, start: str | None, end:
     end_time = parse_time(end)
     if not start_time or not end_time:
         return False
-    local = now_utc.astimezone(ZoneInfo(timezone_str))
+    local = now_utc.astimezone(_zone(timezone_str))
     local_time = local.time()
 
     if start_time < end_time:
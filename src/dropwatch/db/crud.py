@@ -2,10 +2,15 @@ from __future__ import annotations
 
 import json
 from datetime import datetime, timedelta
-from typing import Iterable
+from typing import AsyncIterator, Iterable
 
-from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy import DateTime, Float, bindparam, delete, func, insert, lambda_stmt, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.sql.functions import FunctionElement
 
 from dropwatch.db.models import (
     Condition,
@@ -20,10 +25,40 @@ from dropwatch.db.models import (
     User,
 )
 
+# Функции здесь не коммитят: транзакцией управляет вызывающий (unit_of_work или явный commit).
+
+# Длинные IN (...) режем на куски: у SQLite лимит на число параметров запроса.
+IN_LIST_CHUNK = 500
+
+
+class _seconds_between(FunctionElement):
+    # Разница (end - start) в секундах; арифметика дат у диалектов своя.
+    type = Float()
+    name = "seconds_between"
+    inherit_cache = True
+
+
+@compiles(_seconds_between)
+def _seconds_between_default(element, compiler, **kw) -> str:
+    start, end = element.clauses
+    return f"EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)}))"
+
+
+@compiles(_seconds_between, "sqlite")
+def _seconds_between_sqlite(element, compiler, **kw) -> str:
+    start, end = element.clauses
+    # julianday — double в днях; округляем до миллисекунд, чтобы ровно interval_sec не давал 59.99999.
+    diff = f"(julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}))"
+    return f"round({diff} * 86400.0, 3)"
+
+
+async def _load_user_by_tg(session: AsyncSession, tg_id: int) -> User | None:
+    result = await session.execute(lambda_stmt(lambda: select(User).where(User.tg_id == tg_id)))
+    return result.scalars().first()
+
 
 async def get_or_create_user(session: AsyncSession, tg_id: int, timezone_str: str, default_interval: int) -> User:
-    result = await session.execute(select(User).where(User.tg_id == tg_id))
-    user = result.scalars().first()
+    user = await _load_user_by_tg(session, tg_id)
     if user:
         return user
     user = User(
@@ -35,8 +70,7 @@ async def get_or_create_user(session: AsyncSession, tg_id: int, timezone_str: st
         event_update=False,
     )
     session.add(user)
-    await session.commit()
-    await session.refresh(user)
+    await session.flush()
     return user
 
 
@@ -46,7 +80,6 @@ async def update_user_settings(
     **kwargs,
 ) -> None:
     await session.execute(update(User).where(User.id == user_id).values(**kwargs))
-    await session.commit()
 
 
 async def list_tasks(session: AsyncSession, user_id: int) -> list[Task]:
@@ -55,11 +88,11 @@ async def list_tasks(session: AsyncSession, user_id: int) -> list[Task]:
 
 
 async def get_task(session: AsyncSession, task_id: int, user_id: int | None = None) -> Task | None:
-    stmt = select(Task).where(Task.id == task_id)
-    if user_id is not None:
-        stmt = stmt.where(Task.user_id == user_id)
-    result = await session.execute(stmt)
-    return result.scalars().first()
+    # session.get сначала смотрит identity map: повторный доступ к задаче в той же сессии без запроса.
+    task = await session.get(Task, task_id)
+    if task is None or (user_id is not None and task.user_id != user_id):
+        return None
+    return task
 
 
 async def create_task(
@@ -92,91 +125,130 @@ async def create_task(
         radius_km=radius_km,
         price_min=price_min,
         price_max=price_max,
-        condition=condition,
-        delivery=delivery,
-        seller_type=seller_type,
+        condition=condition.value,
+        delivery=delivery.value,
+        seller_type=seller_type.value,
         sort_new_first=sort_new_first,
         interval_sec=interval_sec,
-        status=status,
+        status=status.value,
         search_url=search_url,
         source=source,
     )
     session.add(task)
-    await session.commit()
-    await session.refresh(task)
+    await session.flush()
     return task
 
 
 async def update_task(session: AsyncSession, task_id: int, **kwargs) -> None:
     await session.execute(update(Task).where(Task.id == task_id).values(**kwargs))
-    await session.commit()
 
 
 async def delete_task(session: AsyncSession, task_id: int) -> None:
     await session.execute(delete(Task).where(Task.id == task_id))
-    await session.commit()
 
 
 async def clear_seen_for_task(session: AsyncSession, task_id: int) -> None:
     await session.execute(delete(SeenListing).where(SeenListing.task_id == task_id))
-    await session.commit()
+    # Новая версия задачи: монитор не пропустит ее на неизменившейся общей ленте.
+    await session.execute(update(Task).where(Task.id == task_id).values(updated_at=datetime.utcnow()))
 
 
 async def set_task_status(session: AsyncSession, task_id: int, status: TaskStatus) -> None:
-    await session.execute(update(Task).where(Task.id == task_id).values(status=status))
-    await session.commit()
+    await session.execute(update(Task).where(Task.id == task_id).values(status=status.value))
 
 
 async def pause_tasks_for_user(session: AsyncSession, user_id: int) -> None:
     await session.execute(
         update(Task)
-        .where(Task.user_id == user_id, Task.status == TaskStatus.active)
-        .values(status=TaskStatus.paused)
+        .where(Task.user_id == user_id, Task.status == TaskStatus.active.value)
+        .values(status=TaskStatus.paused.value)
     )
-    await session.commit()
 
 
-async def list_due_tasks(session: AsyncSession, now: datetime, owner_tg_id: int | None = None) -> list[Task]:
+async def list_due_tasks(
+    session: AsyncSession,
+    now: datetime,
+    owner_tg_id: int | None = None,
+    limit: int | None = None,
+) -> list[Task]:
+    # Срок проверки считаем в SQL: из базы приходят только задачи, которым пора.
+    elapsed = _seconds_between(Task.last_checked_at, bindparam("now", now, type_=DateTime()))
     stmt = (
         select(Task)
         .join(User, Task.user_id == User.id)
         .outerjoin(Settings, Settings.user_id == User.id)
+        # Пользователь и его настройки приходят тем же JOIN'ом: монитору не нужен запрос на каждую задачу.
+        .options(contains_eager(Task.user).contains_eager(User.settings))
         .where(
-            Task.status == TaskStatus.active,
+            Task.status == TaskStatus.active.value,
             or_(Settings.id.is_(None), Settings.monitor_enabled.is_(True)),
+            or_(Task.last_checked_at.is_(None), elapsed >= Task.interval_sec),
         )
     )
     if owner_tg_id is not None:
         stmt = stmt.where(User.tg_id == owner_tg_id)
+    if limit:
+        # Самые просроченные первыми; остаток добирается следующим тиком.
+        # SKIP LOCKED: параллельный воркер пропускает строки, заблокированные другим. Блокировка живет до коммита,
+        # поэтому вызывающий забирает задачи claim_tasks в этой же транзакции. SQLite FOR UPDATE игнорирует.
+        stmt = (
+            stmt.order_by(Task.last_checked_at.asc().nulls_first(), Task.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=Task)
+        )
     result = await session.execute(stmt)
-    tasks = list(result.scalars())
-    due: list[Task] = []
-    for task in tasks:
-        if task.last_checked_at is None:
-            due.append(task)
-            continue
-        if now - task.last_checked_at >= timedelta(seconds=task.interval_sec):
-            due.append(task)
-    return due
-
-
-async def list_active_tasks(session: AsyncSession) -> list[Task]:
-    result = await session.execute(select(Task).where(Task.status == TaskStatus.active))
     return list(result.scalars())
 
 
+# Отметка проверки — не правка задачи: updated_at оставляем как есть, иначе onupdate двигал бы его каждый тик.
 async def touch_task(session: AsyncSession, task_id: int, when: datetime) -> None:
-    await session.execute(update(Task).where(Task.id == task_id).values(last_checked_at=when))
-    await session.commit()
+    await session.execute(
+        update(Task).where(Task.id == task_id).values(last_checked_at=when, updated_at=Task.updated_at)
+    )
+
+
+async def claim_tasks(session: AsyncSession, task_ids: list[int], when: datetime) -> None:
+    # Отметка взятых задач: после коммита другие воркеры не видят их среди due до следующего интервала.
+    # Загруженные объекты не синхронизируем — монитор смотрит на прежний last_checked_at (first_run).
+    for start in range(0, len(task_ids), IN_LIST_CHUNK):
+        chunk = task_ids[start : start + IN_LIST_CHUNK]
+        await session.execute(
+            update(Task)
+            .where(Task.id.in_(chunk))
+            .values(last_checked_at=when, updated_at=Task.updated_at)
+            .execution_options(synchronize_session=False)
+        )
 
 
 async def get_seen_listing(session: AsyncSession, task_id: int, listing_id: str) -> SeenListing | None:
     result = await session.execute(
-        select(SeenListing).where(SeenListing.task_id == task_id, SeenListing.listing_id == listing_id)
+        lambda_stmt(
+            lambda: select(SeenListing).where(SeenListing.task_id == task_id, SeenListing.listing_id == listing_id)
+        )
     )
     return result.scalars().first()
 
 
+async def get_seen_listings_map(
+    session: AsyncSession,
+    task_id: int,
+    listing_ids: Iterable[str],
+) -> dict[str, SeenListing]:
+    # Один IN-запрос вместо SELECT на каждое объявление; пачки держат число параметров в рамках лимитов драйверов.
+    ids = list(dict.fromkeys(listing_ids))
+    seen: dict[str, SeenListing] = {}
+    for start in range(0, len(ids), IN_LIST_CHUNK):
+        result = await session.execute(
+            select(SeenListing).where(
+                SeenListing.task_id == task_id,
+                SeenListing.listing_id.in_(ids[start : start + IN_LIST_CHUNK]),
+            )
+        )
+        for row in result.scalars():
+            seen[row.listing_id] = row
+    return seen
+
+
 async def add_seen_listing(
     session: AsyncSession,
     task_id: int,
@@ -198,11 +270,19 @@ async def add_seen_listing(
         last_seen_at=datetime.utcnow(),
     )
     session.add(seen)
-    await session.commit()
-    await session.refresh(seen)
+    await session.flush()
     return seen
 
 
+async def bulk_add_seen_listings(session: AsyncSession, task_id: int, items: Iterable[dict]) -> None:
+    # Новые объявления за тик пишем одним executemany.
+    now = datetime.utcnow()
+    rows = [{**item, "task_id": task_id, "last_seen_at": now} for item in items]
+    if not rows:
+        return
+    await session.execute(insert(SeenListing), rows)
+
+
 async def update_seen_listing(
     session: AsyncSession,
     seen_id: int,
@@ -224,7 +304,29 @@ async def update_seen_listing(
             last_seen_at=datetime.utcnow(),
         )
     )
-    await session.commit()
+
+
+async def bulk_update_seen_listings(session: AsyncSession, rows: Iterable[dict]) -> None:
+    # rows: {"b_id": seen.id, "last_price": ..., ...}; b_id через bindparam, чтобы не конфликтовать с колонкой id.
+    now = datetime.utcnow()
+    params = [{**row, "last_seen_at": now} for row in rows]
+    if not params:
+        return
+    stmt = (
+        update(SeenListing)
+        .where(SeenListing.id == bindparam("b_id"))
+        .values(
+            last_price=bindparam("last_price"),
+            last_title=bindparam("last_title"),
+            last_url=bindparam("last_url"),
+            last_location=bindparam("last_location"),
+            last_hash=bindparam("last_hash"),
+            last_seen_at=bindparam("last_seen_at"),
+        )
+    )
+    # Core executemany через соединение сессии: ORM-путь требует PK в каждой строке и не допускает WHERE.
+    connection = await session.connection()
+    await connection.execute(stmt, params)
 
 
 async def mute_seen_listing(session: AsyncSession, task_id: int, listing_id: str) -> None:
@@ -233,7 +335,6 @@ async def mute_seen_listing(session: AsyncSession, task_id: int, listing_id: str
         .where(SeenListing.task_id == task_id, SeenListing.listing_id == listing_id)
         .values(is_muted=True)
     )
-    await session.commit()
 
 
 async def add_favorite(
@@ -245,21 +346,21 @@ async def add_favorite(
     url: str | None,
     location: str | None,
 ) -> None:
-    existing = await session.execute(
-        select(Favorite).where(Favorite.user_id == user_id, Favorite.listing_id == listing_id)
-    )
-    if existing.scalars().first():
-        return
-    favorite = Favorite(
-        user_id=user_id,
-        listing_id=listing_id,
-        title=title,
-        price=price,
-        url=url,
-        location=location,
+    # Дубликаты отсекает uq_user_listing: один INSERT ... ON CONFLICT DO NOTHING вместо SELECT + INSERT.
+    dialect_insert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = (
+        dialect_insert(Favorite)
+        .values(
+            user_id=user_id,
+            listing_id=listing_id,
+            title=title,
+            price=price,
+            url=url,
+            location=location,
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "listing_id"])
     )
-    session.add(favorite)
-    await session.commit()
+    await session.execute(stmt)
 
 
 async def list_favorites(session: AsyncSession, user_id: int) -> list[Favorite]:
@@ -267,37 +368,61 @@ async def list_favorites(session: AsyncSession, user_id: int) -> list[Favorite]:
     return list(result.scalars())
 
 
+async def iter_favorites(session: AsyncSession, user_id: int, limit: int | None = None) -> AsyncIterator[Favorite]:
+    # Для вывода списка: строки идут курсором, без материализации всего избранного.
+    stmt = select(Favorite).where(Favorite.user_id == user_id).order_by(Favorite.saved_at.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    async for favorite in await session.stream_scalars(stmt):
+        yield favorite
+
+
 async def log_notification(session: AsyncSession, user_id: int) -> None:
     session.add(NotificationLog(user_id=user_id))
-    await session.commit()
+
+
+async def bulk_log_notifications(session: AsyncSession, rows: Iterable[tuple[int, datetime]]) -> None:
+    params = [{"user_id": user_id, "sent_at": sent_at} for user_id, sent_at in rows]
+    if params:
+        await session.execute(insert(NotificationLog), params)
 
 
 async def notification_count_last_hour(session: AsyncSession, user_id: int) -> int:
     cutoff = datetime.utcnow() - timedelta(hours=1)
     result = await session.execute(
-        select(func.count(NotificationLog.id)).where(
+        lambda_stmt(
+            lambda: select(func.count(NotificationLog.id)).where(
+                NotificationLog.user_id == user_id,
+                NotificationLog.sent_at >= cutoff,
+            )
+        )
+    )
+    return int(result.scalar() or 0)
+
+
+async def notification_times_last_hour(session: AsyncSession, user_id: int) -> list[datetime]:
+    cutoff = datetime.utcnow() - timedelta(hours=1)
+    result = await session.execute(
+        select(NotificationLog.sent_at).where(
             NotificationLog.user_id == user_id,
             NotificationLog.sent_at >= cutoff,
         )
     )
-    return int(result.scalar() or 0)
+    return list(result.scalars())
 
 
 async def delete_favorite(session: AsyncSession, user_id: int, listing_id: str) -> None:
     await session.execute(
         delete(Favorite).where(Favorite.user_id == user_id, Favorite.listing_id == listing_id)
     )
-    await session.commit()
 
 
 async def get_user(session: AsyncSession, user_id: int) -> User | None:
-    result = await session.execute(select(User).where(User.id == user_id))
-    return result.scalars().first()
+    return await session.get(User, user_id)
 
 
 async def get_user_by_tg(session: AsyncSession, tg_id: int) -> User | None:
-    result = await session.execute(select(User).where(User.tg_id == tg_id))
-    return result.scalars().first()
+    return await _load_user_by_tg(session, tg_id)
 
 
 async def get_tasks_for_user(session: AsyncSession, user_id: int) -> list[Task]:
@@ -318,23 +443,26 @@ async def get_or_create_settings(
     current = await get_settings(session, user_id)
     if current:
         return current
-    current = Settings(
-        user_id=user_id,
-        interval=default_interval,
-        avito_links_json="[]",
-        keywords_white_json="[]",
-        keywords_black_json="[]",
-        monitor_enabled=False,
+    # Строку могут создавать параллельно (задачи одного пользователя в мониторе, бот): settings.user_id уникален,
+    # поэтому INSERT ... ON CONFLICT DO NOTHING и повторный SELECT вместо add + flush с IntegrityError.
+    dialect_insert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    await session.execute(
+        dialect_insert(Settings)
+        .values(
+            user_id=user_id,
+            interval=default_interval,
+            avito_links_json="[]",
+            keywords_white_json="[]",
+            keywords_black_json="[]",
+            monitor_enabled=False,
+        )
+        .on_conflict_do_nothing(index_elements=["user_id"])
     )
-    session.add(current)
-    await session.commit()
-    await session.refresh(current)
-    return current
+    return await get_settings(session, user_id)
 
 
 async def update_settings(session: AsyncSession, user_id: int, **kwargs) -> None:
     await session.execute(update(Settings).where(Settings.user_id == user_id).values(**kwargs))
-    await session.commit()
 
 
 async def add_link_to_settings(session: AsyncSession, user_id: int, link: str) -> None:
@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import BigInteger, Enum, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -15,22 +20,89 @@ _SessionLocal: async_sessionmaker[AsyncSession] | None = None
 def init_engine(database_url: str) -> AsyncEngine:
     global _engine, _SessionLocal
     if _engine is None:
-        _engine = create_async_engine(database_url, future=True, echo=False)
+        if make_url(database_url).get_backend_name() == "sqlite":
+            _engine = create_async_engine(database_url, future=True, echo=False, query_cache_size=1200)
+            event.listen(_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        else:
+            _engine = create_async_engine(
+                database_url,
+                future=True,
+                echo=False,
+                query_cache_size=1200,
+                pool_size=10,
+                max_overflow=20,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+            )
         _SessionLocal = async_sessionmaker(_engine, expire_on_commit=False)
     return _engine
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL + NORMAL: коммит дописывает журнал без fsync основной базы, читатели не блокируют писателя.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
 def get_sessionmaker() -> async_sessionmaker[AsyncSession]:
     if _SessionLocal is None:
         raise RuntimeError("Database engine not initialized")
     return _SessionLocal
 
 
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    # crud не коммитит сам: одна транзакция на блок, commit на выходе, rollback при исключении.
+    async with get_sessionmaker().begin() as session:
+        yield session
+
+
 async def init_db() -> None:
     if _engine is None:
         raise RuntimeError("Database engine not initialized")
     async with _engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_widen_tg_id)
+        await conn.run_sync(_drop_native_enums)
+
+
+def _create_missing_indexes(connection) -> None:
+    # create_all не трогает уже существующие таблицы: индексы, добавленные в модели позже, досоздаём сами.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _widen_tg_id(connection) -> None:
+    # Telegram id не влезают в INT32. В SQLite INTEGER и так 64-битный, в Postgres расширяем старую колонку.
+    if connection.dialect.name != "postgresql":
+        return
+    columns = {column["name"]: column["type"] for column in inspect(connection).get_columns("users")}
+    if not isinstance(columns.get("tg_id"), BigInteger):
+        connection.execute(text("ALTER TABLE users ALTER COLUMN tg_id TYPE BIGINT"))
+
+
+_ENUM_COLUMNS = ("condition", "delivery", "seller_type", "status")
+
+
+def _drop_native_enums(connection) -> None:
+    # Статусы и фильтры задач теперь String(16); старые Postgres ENUM-колонки переводим в varchar.
+    # Значения совпадают с именами членов enum, так что данные не меняются.
+    if connection.dialect.name != "postgresql":
+        return
+    columns = {column["name"]: column["type"] for column in inspect(connection).get_columns("tasks")}
+    for name in _ENUM_COLUMNS:
+        column_type = columns.get(name)
+        if isinstance(column_type, Enum):
+            connection.execute(
+                text(f"ALTER TABLE tasks ALTER COLUMN {name} TYPE VARCHAR(16) USING {name}::text")
+            )
+            if column_type.name:
+                connection.execute(text(f"DROP TYPE IF EXISTS {column_type.name}"))
 
 
 async def create_db() -> None:
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 import enum
 
-from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from dropwatch.db.database import Base
@@ -37,7 +37,7 @@ class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    tg_id: Mapped[int] = mapped_column(Integer, unique=True, index=True)
+    tg_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True)
     timezone: Mapped[str] = mapped_column(String(64), default="Europe/Moscow")
 
     default_interval_sec: Mapped[int] = mapped_column(Integer, default=120)
@@ -84,6 +84,7 @@ class Settings(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (Index("ix_tasks_due", "status", "last_checked_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -97,13 +98,14 @@ class Task(Base):
     price_min: Mapped[int | None] = mapped_column(Integer, nullable=True)
     price_max: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
-    condition: Mapped[Condition] = mapped_column(Enum(Condition), default=Condition.any)
-    delivery: Mapped[Delivery] = mapped_column(Enum(Delivery), default=Delivery.any)
-    seller_type: Mapped[SellerType] = mapped_column(Enum(SellerType), default=SellerType.any)
+    # Enum-классы выше — str-enum: значения хранятся строками и сравниваются с ними напрямую, без coerce при чтении.
+    condition: Mapped[str] = mapped_column(String(16), default=Condition.any.value)
+    delivery: Mapped[str] = mapped_column(String(16), default=Delivery.any.value)
+    seller_type: Mapped[str] = mapped_column(String(16), default=SellerType.any.value)
 
     sort_new_first: Mapped[bool] = mapped_column(Boolean, default=True)
     interval_sec: Mapped[int] = mapped_column(Integer, default=120)
-    status: Mapped[TaskStatus] = mapped_column(Enum(TaskStatus), default=TaskStatus.active)
+    status: Mapped[str] = mapped_column(String(16), default=TaskStatus.active.value)
 
     search_url: Mapped[str | None] = mapped_column(Text, nullable=True)
     source: Mapped[str | None] = mapped_column(String(50), nullable=True)
@@ -118,7 +120,10 @@ class Task(Base):
 
 class SeenListing(Base):
     __tablename__ = "seen_listings"
-    __table_args__ = (UniqueConstraint("task_id", "listing_id", name="uq_task_listing"),)
+    __table_args__ = (
+        UniqueConstraint("task_id", "listing_id", name="uq_task_listing"),
+        Index("ix_seen_task_listing_muted", "task_id", "is_muted"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     task_id: Mapped[int] = mapped_column(ForeignKey("tasks.id"), index=True)
@@ -154,6 +159,7 @@ class Favorite(Base):
 
 class NotificationLog(Base):
     __tablename__ = "notification_log"
+    __table_args__ = (Index("ix_notification_user_sent", "user_id", "sent_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
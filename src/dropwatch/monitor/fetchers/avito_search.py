@@ -2,20 +2,22 @@ from __future__ import annotations
 
 import asyncio
 import html
-import json
 import logging
 import random
 import re
 import time
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Any, Iterable
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator
 from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
 import httpx
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from curl_cffi import requests as curl_requests
+from lxml import etree
+from lxml import html as lxml_html
 
 from dropwatch.common.config import settings
 from dropwatch.common.types import Listing
@@ -44,11 +46,22 @@ HEADERS = {
     "(KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
 }
 
+# Пул соединений curl на один фетчер: keep-alive между страницами и карточками вместо нового TLS на запрос.
+MAX_CLIENTS = 10
+
+COOKIES_SAVE_INTERVAL_SEC = 5.0
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_CAP_SEC = 60
+
 BLOCK_MARKERS = (
     "\u0414\u043e\u0441\u0442\u0443\u043f \u043e\u0433\u0440\u0430\u043d\u0438\u0447\u0435\u043d",
     "problem with ip",
     "captcha",
 )
+# Страницы блокировки маленькие, маркер стоит в <title> или первом блоке: обычную выдачу целиком не сканируем.
+BLOCK_SCAN_PREFIX = 4096
+# Маркеры сравниваются с текстом в нижнем регистре, поэтому и сами приводятся к нему заранее.
+_BLOCK_MARKERS_LOWER = tuple(marker.lower() for marker in BLOCK_MARKERS)
 
 
 class RateLimitError(RuntimeError):
@@ -84,6 +97,7 @@ class AvitoRuntimeProfile:
     timeout_sec: int | None = None
     parse_views: bool | None = None
     views_delay_sec: float | None = None
+    views_concurrency: int | None = None
 
 
 class AvitoSearchFetcher(BaseFetcher):
@@ -115,45 +129,70 @@ class AvitoSearchFetcher(BaseFetcher):
             0.0,
             self.profile.views_delay_sec if self.profile.views_delay_sec is not None else settings.avito_views_delay_sec,
         )
+        self.views_concurrency = max(1, self.profile.views_concurrency or settings.avito_views_concurrency)
         self.cookies_path = self.profile.cookies_path or settings.avito_cookies_path
-        self.session = curl_requests.Session()
+        self.session: curl_requests.AsyncSession | None = None
         self.cookies = _load_cookies(self.cookies_path)
+        self._cookies_dirty = False
+        self._cookies_saved_at = time.monotonic()
         self.external_cookie_id: str | None = None
-        self._apply_cookies()
+        self._cookies_api_session: requests.Session | None = None
+        self._ip_client: httpx.AsyncClient | None = None
+        # Восстановление после блокировки (сессия, cookies, IP) — одно на блокировку, даже при параллельных запросах.
+        self._recovery_lock = asyncio.Lock()
+        self._recovery_generation = 0
         self.good_request_count = 0
         self.bad_request_count = 0
 
     async def fetch(self, task=None, profile=None) -> list[Listing]:
         if profile is not None:
-            return await AvitoSearchFetcher(profile=profile).fetch(task=task)
+            fetcher = AvitoSearchFetcher(profile=profile)
+            try:
+                return await fetcher.fetch(task=task)
+            finally:
+                await fetcher.close()
         if not task or not task.search_url:
             logger.info("AvitoSearchFetcher: no task url")
             return []
-        return await asyncio.to_thread(self._fetch_sync, task.search_url)
-
-    def _fetch_sync(self, url: str) -> list[Listing]:
+        # Сессия остается открытой между вызовами: монитор переиспользует фетчер, и keep-alive к Avito сохраняется.
+        try:
+            return await self._fetch(task.search_url)
+        finally:
+            self._flush_cookies()
+
+    async def close(self) -> None:
+        await self._close_session()
+        if self._ip_client is not None:
+            ip_client, self._ip_client = self._ip_client, None
+            await ip_client.aclose()
+        if self._cookies_api_session is not None:
+            api_session, self._cookies_api_session = self._cookies_api_session, None
+            api_session.close()
+
+    async def _close_session(self) -> None:
+        if self.session is not None:
+            session, self.session = self.session, None
+            await session.close()
+
+    async def _fetch(self, url: str) -> list[Listing]:
         listings: dict[str, Listing] = {}
-        current_url = url
 
-        for page in range(self.max_pages):
-            html_code = self._fetch_data(current_url)
+        for page, current_url in zip(range(self.max_pages), _iter_page_urls(url)):
+            if page and self.pause_sec:
+                await asyncio.sleep(self.pause_sec)
+            html_code = await self._fetch_data(current_url)
             if not html_code:
                 break
 
             data_from_page = _extract_state_data(html_code)
-            items = _extract_items(data_from_page)
-            parsed = [_to_listing(item, current_url) for item in items]
-            for listing in parsed:
-                listings.setdefault(listing.listing_id, listing)
-
-            current_url = _next_page_url(current_url)
-            if not current_url:
-                break
-            if page < self.max_pages - 1 and self.pause_sec:
-                time.sleep(self.pause_sec)
+            for item in _extract_items(data_from_page):
+                # Повторы между страницами отсекаем по id до сборки Listing.
+                listing_id = _listing_id(item)
+                if listing_id not in listings:
+                    listings[listing_id] = _to_listing(item, current_url, listing_id)
 
         if self.parse_views and listings:
-            self._fill_views(listings.values())
+            await self._fill_views(listings.values())
 
         logger.info(
             "AvitoSearchFetcher: good_requests=%s bad_requests=%s",
@@ -162,7 +201,8 @@ class AvitoSearchFetcher(BaseFetcher):
         )
         return list(listings.values())
 
-    def _fetch_data(self, url: str) -> str | None:
+    async def _fetch_data(self, url: str, recover: bool = True) -> str | None:
+        # recover=False: на первой блокировке сразу отдаем ошибку наверх, без ретраев и восстановления.
         proxies = None
         if self.proxy_config.proxy_url:
             proxies = {"https": self.proxy_config.proxy_url}
@@ -172,8 +212,13 @@ class AvitoSearchFetcher(BaseFetcher):
         last_blocked = False
 
         for attempt in range(1, self.max_retries + 1):
+            if self._recovery_lock.locked():
+                # Пока другой запрос меняет сессию и IP, новых запросов не начинаем.
+                async with self._recovery_lock:
+                    pass
+            generation = self._recovery_generation
             try:
-                response = self.session.get(
+                response = await self._get_session().get(
                     url=url,
                     headers=self.headers,
                     proxies=proxies,
@@ -184,33 +229,29 @@ class AvitoSearchFetcher(BaseFetcher):
                 )
             except curl_requests.RequestsError as exc:
                 logger.warning("Avito request failed attempt=%s error=%s", attempt, exc)
-                self._backoff(attempt)
+                await self._backoff(attempt)
                 continue
 
             status = response.status_code
             text = response.text or ""
             if status >= 500:
                 logger.warning("Avito server error status=%s attempt=%s", status, attempt)
-                self._backoff(attempt)
+                await self._backoff(attempt)
                 continue
-            blocked_page = _looks_blocked(text)
+            blocked_page = _looks_blocked(text[:BLOCK_SCAN_PREFIX])
             if status in (302, 403, 429) or blocked_page:
                 self.bad_request_count += 1
                 logger.warning("Avito blocked status=%s attempt=%s", status, attempt)
                 last_status = status
                 last_blocked = blocked_page
-                retry_after = response.headers.get("Retry-After")
-                if retry_after:
-                    try:
-                        last_retry_after = int(retry_after)
-                    except ValueError:
-                        last_retry_after = None
-                self._reset_session()
-                self._refresh_cookies_from_api()
-                if attempt >= 3:
-                    self._refresh_cookies()
-                self._change_ip()
-                self._backoff(attempt)
+                last_retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                if not recover:
+                    break
+                if last_retry_after is not None and last_retry_after > BACKOFF_CAP_SEC:
+                    # Ждать дольше капа внутри запроса нет смысла: отдаем 429 наверх, монитор отложит задачу.
+                    break
+                await self._recover(generation, attempt)
+                await self._backoff(attempt, last_retry_after)
                 continue
 
             self.good_request_count += 1
@@ -224,26 +265,61 @@ class AvitoSearchFetcher(BaseFetcher):
         logger.warning("Avito request failed after retries url=%s", url)
         return None
 
-    def _reset_session(self) -> None:
-        self.session = curl_requests.Session()
-        self._apply_cookies()
+    async def _recover(self, generation: int, attempt: int) -> None:
+        async with self._recovery_lock:
+            if generation != self._recovery_generation:
+                # Эту блокировку уже отработал параллельный запрос.
+                return
+            await self._reset_session()
+            cookies = await asyncio.to_thread(self._request_api_cookies)
+            if cookies:
+                self.cookies = cookies
+                _save_cookies(self.cookies_path, self.cookies)
+                logger.info("Avito cookies updated from external API")
+            if attempt >= 3:
+                await self._refresh_cookies()
+            await self._change_ip()
+            self._recovery_generation += 1
+
+    def _get_session(self) -> curl_requests.AsyncSession:
+        if self.session is None:
+            self.session = curl_requests.AsyncSession(max_clients=MAX_CLIENTS)
+            self._apply_cookies()
+        return self.session
+
+    async def _reset_session(self) -> None:
+        # Новая сессия создастся лениво при следующем запросе, с текущими cookies.
+        await self._close_session()
 
     def _apply_cookies(self) -> None:
-        if self.cookies:
+        if self.cookies and self.session is not None:
             self.session.cookies.update(self.cookies)
 
     def _save_cookies(self) -> None:
+        # В памяти cookies обновляем на каждом успешном ответе, а на диск пишем не чаще раза в интервал и в конце fetch.
+        if self.session is None:
+            return
         try:
             self.cookies = self.session.cookies.get_dict()
-            _save_cookies(self.cookies_path, self.cookies)
         except Exception:
             logger.debug("Avito cookies save failed", exc_info=True)
+            return
+        self._cookies_dirty = True
+        if time.monotonic() - self._cookies_saved_at >= COOKIES_SAVE_INTERVAL_SEC:
+            self._flush_cookies()
+
+    def _flush_cookies(self) -> None:
+        if not self._cookies_dirty:
+            return
+        _save_cookies(self.cookies_path, self.cookies)
+        self._cookies_dirty = False
+        self._cookies_saved_at = time.monotonic()
 
-    def _refresh_cookies(self) -> None:
+    async def _refresh_cookies(self) -> None:
         if not self.use_webdriver:
             return
         try:
-            cookies, user_agent = asyncio.run(_get_cookies_via_playwright(self.proxy_config))
+            cookies, user_agent = await _get_cookies_via_playwright(self.proxy_config)
         except Exception:
             logger.exception("Avito cookie refresh failed")
             return
@@ -254,13 +330,15 @@ class AvitoSearchFetcher(BaseFetcher):
             self._apply_cookies()
             _save_cookies(self.cookies_path, self.cookies)
 
-    def _refresh_cookies_from_api(self) -> None:
+    def _request_api_cookies(self) -> dict[str, str] | None:
+        # Работает в потоке: только запрос и разбор, cookies фетчера меняет вызывающий в цикле событий.
         api_key = (self.cookies_api_key or "").strip()
         if not api_key:
-            return
+            return None
+        api_session = self._get_cookies_api_session()
         if self.external_cookie_id:
             try:
-                requests.post(
+                api_session.post(
                     "https://spfa.ru/api/unblock/",
                     json={"id": self.external_cookie_id, "api_key": api_key},
                     timeout=15,
@@ -271,18 +349,18 @@ class AvitoSearchFetcher(BaseFetcher):
         if self.external_cookie_id:
             payload["id"] = self.external_cookie_id
         try:
-            response = requests.post("https://spfa.ru/api/cookies/", json=payload, timeout=20)
+            response = api_session.post("https://spfa.ru/api/cookies/", json=payload, timeout=20)
         except requests.RequestException:
             logger.warning("Avito external cookies request failed", exc_info=True)
-            return
+            return None
         if not response.ok:
             logger.warning("Avito external cookies bad status=%s", response.status_code)
-            return
+            return None
         try:
             data = response.json()
         except ValueError:
             logger.warning("Avito external cookies invalid JSON")
-            return
+            return None
         record = {}
         if isinstance(data, dict):
             if isinstance(data.get("results"), dict):
@@ -298,51 +376,91 @@ class AvitoSearchFetcher(BaseFetcher):
         parsed = _normalize_external_cookies(raw_cookies)
         if not parsed:
             logger.warning("Avito external cookies missing payload")
-            return
-        self.cookies = parsed
-        self._apply_cookies()
-        _save_cookies(self.cookies_path, self.cookies)
-        logger.info("Avito cookies updated from external API")
+            return None
+        return parsed
+
+    def _get_cookies_api_session(self) -> requests.Session:
+        # unblock и cookies идут на один хост подряд: общая сессия держит одно keep-alive соединение.
+        if self._cookies_api_session is None:
+            self._cookies_api_session = requests.Session()
+        return self._cookies_api_session
 
-    def _change_ip(self) -> None:
+    def _get_ip_client(self) -> httpx.AsyncClient:
+        # Ротация IP дергает один и тот же адрес на каждой блокировке: клиент держит соединение открытым.
+        if self._ip_client is None:
+            self._ip_client = httpx.AsyncClient(timeout=20, limits=httpx.Limits(max_keepalive_connections=2))
+        return self._ip_client
+
+    async def _change_ip(self) -> None:
         if not self.proxy_change_url:
             return
         try:
-            response = httpx.get(self.proxy_change_url, timeout=20)
+            response = await self._get_ip_client().get(self.proxy_change_url)
             if response.status_code == 200:
                 logger.info("Avito proxy IP changed")
         except Exception:
             logger.warning("Avito proxy IP change failed", exc_info=True)
 
     @staticmethod
-    def _backoff(attempt: int) -> None:
-        delay = min(10, attempt) + random.uniform(0.1, 0.9)
-        time.sleep(delay)
-
-    def _fill_views(self, listings: Iterable[Listing]) -> None:
-        for listing in listings:
-            if not listing.url:
-                continue
-            try:
-                html_code = self._fetch_data(listing.url)
-            except (RateLimitError, BlockedError):
-                return
-            if not html_code:
-                continue
-            total_views, today_views = _extract_views(html_code)
-            listing.total_views = total_views
-            listing.today_views = today_views
-            if self.views_delay_sec:
-                time.sleep(self.views_delay_sec)
+    async def _backoff(attempt: int, retry_after: int | None = None) -> None:
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, 1)
+        else:
+            # Экспоненциальный рост с полным джиттером: параллельные ретраи расходятся во времени.
+            delay = min(BACKOFF_CAP_SEC, random.uniform(BACKOFF_BASE_SEC, BACKOFF_BASE_SEC * 2**attempt))
+        await asyncio.sleep(delay)
+
+    async def _fill_views(self, listings: Iterable[Listing]) -> None:
+        # Карточки независимы: качаем параллельно, но не больше views_concurrency сразу.
+        # Пауза остается внутри семафора, чтобы каждое соединение шло не чаще прежнего.
+        semaphore = asyncio.Semaphore(self.views_concurrency)
+        jobs: list[asyncio.Task[None]] = []
+
+        async def _fill_one(listing: Listing) -> None:
+            async with semaphore:
+                try:
+                    html_code = await self._fetch_data(listing.url, recover=False)
+                except (RateLimitError, BlockedError):
+                    # Первый же бан снимает остальные карточки; сессию и IP восстановит следующая выдача.
+                    logger.warning("Avito views stopped: blocked")
+                    current = asyncio.current_task()
+                    for job in jobs:
+                        if job is not current:
+                            job.cancel()
+                    return
+                if html_code:
+                    listing.total_views, listing.today_views = _extract_views(html_code)
+                if self.views_delay_sec:
+                    await asyncio.sleep(self.views_delay_sec)
+
+        jobs.extend(asyncio.create_task(_fill_one(listing)) for listing in listings if listing.url)
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, asyncio.CancelledError):
+                logger.debug("Avito views fetch failed", exc_info=result)
+
+# Из страницы нужны только отдельные узлы: strainer не строит остальное дерево.
+_STATE_SCRIPTS = SoupStrainer("script", attrs={"type": "mime/invalid"})
+# Просмотры читаем напрямую из дерева lxml скомпилированным XPath, без обертки BeautifulSoup.
+_VIEWS_XPATH = etree.XPath("//*[@data-marker=$marker]")
+
+
+_STATE_SCRIPT_RE = re.compile(
+    r"<script\b[^>]*\stype=['\"]mime/invalid['\"][^>]*>(.*?)</script>",
+    re.DOTALL | re.IGNORECASE,
+)
 
 
 def _extract_state_data(html_code: str) -> dict:
-    soup = BeautifulSoup(html_code, "html.parser")
-    for script in soup.select("script[type='mime/invalid']"):
-        payload = html.unescape(script.text)
+    # Скрипты состояния ищем регуляркой без построения DOM; BS4 — только если разметка не совпала с шаблоном.
+    payloads = [match.group(1) for match in _STATE_SCRIPT_RE.finditer(html_code)]
+    if not payloads:
+        soup = BeautifulSoup(html_code, "lxml", parse_only=_STATE_SCRIPTS)
+        payloads = [script.text for script in soup.select("script[type='mime/invalid']")]
+    for payload in payloads:
         try:
-            parsed = json.loads(payload)
-        except json.JSONDecodeError:
+            parsed = orjson.loads(_unescape_payload(payload))
+        except orjson.JSONDecodeError:
             continue
         if isinstance(parsed, dict):
             if "state" in parsed:
@@ -353,6 +471,17 @@ def _extract_state_data(html_code: str) -> dict:
     return {}
 
 
+def _unescape_payload(payload: str) -> str:
+    # В state встречаются только базовые сущности: цепочка replace в разы быстрее html.unescape с колбэком на каждую.
+    # Если есть что-то еще (&copy;, &#x27;, & без ;), разбираем полностью через html.unescape.
+    if "&" not in payload:
+        return payload
+    fast = payload.replace("&quot;", '"').replace("&#39;", "'").replace("&lt;", "<").replace("&gt;", ">")
+    if fast.count("&") != fast.count("&amp;"):
+        return html.unescape(payload)
+    return fast.replace("&amp;", "&")
+
+
 def _extract_items(data_from_page: dict) -> list[dict]:
     catalog = None
     if isinstance(data_from_page, dict):
@@ -367,21 +496,26 @@ def _extract_items(data_from_page: dict) -> list[dict]:
     return [item for item in items if isinstance(item, dict)]
 
 
-def _to_listing(item: dict, source_url: str) -> Listing:
-    listing_id = str(item.get("id") or item.get("itemId") or _fallback_id(item))
+def _listing_id(item: dict) -> str:
+    return str(item.get("id") or item.get("itemId") or _fallback_id(item))
+
+
+def _to_listing(item: dict, source_url: str, listing_id: str | None = None) -> Listing:
+    if listing_id is None:
+        listing_id = _listing_id(item)
     url_path = item.get("urlPath") or item.get("url") or ""
     url = _absolute_url(url_path)
     title = item.get("title") or "Объявление"
     description = item.get("description")
-    price = _to_int(_deep_get(item, ["priceDetailed", "value"]) or item.get("price"))
+    price = _to_int(_nested_get(item, "priceDetailed", "value") or item.get("price"))
     location = (
-        _deep_get(item, ["geo", "formattedAddress"])
-        or _deep_get(item, ["addressDetailed", "locationName"])
-        or _deep_get(item, ["location", "name"])
+        _nested_get(item, "geo", "formattedAddress")
+        or _nested_get(item, "addressDetailed", "locationName")
+        or _nested_get(item, "location", "name")
     )
     image_url = _extract_image(item)
     published_at = _to_datetime(item.get("sortTimeStamp"))
-    category = _deep_get(item, ["category", "name"])
+    category = _nested_get(item, "category", "name")
     seller_id = _extract_seller_id(item)
     is_reserved = bool(item.get("isReserved")) if item.get("isReserved") is not None else None
     is_promotion = _is_promotion(item)
@@ -409,25 +543,27 @@ def _fallback_id(item: dict) -> str:
         value = item.get(key)
         if isinstance(value, str) and value:
             return value.strip("/")
-    return str(hash(json.dumps(item, ensure_ascii=True, sort_keys=True)))
+    return str(hash(orjson.dumps(item, option=orjson.OPT_SORT_KEYS)))
+
+
+_GALLERY_KEYS = ("imageLargeUrl", "imageUrl", "imageLargeVipUrl", "imageVipUrl")
 
 
 def _extract_image(item: dict) -> str | None:
     gallery = item.get("gallery") or {}
-    for key in ("imageLargeUrl", "imageUrl", "imageLargeVipUrl", "imageVipUrl"):
+    for key in _GALLERY_KEYS:
         value = gallery.get(key)
         if isinstance(value, str) and value:
             return value
-    images = item.get("images") or []
-    if isinstance(images, list):
-        for image in images:
-            if not isinstance(image, dict):
-                continue
-            root = image.get("root")
-            if isinstance(root, dict):
-                for value in root.values():
-                    if isinstance(value, str) and value:
-                        return value
+    images = item.get("images")
+    if not images or not isinstance(images, list):
+        return None
+    for image in images:
+        root = image.get("root") if isinstance(image, dict) else None
+        if isinstance(root, dict):
+            for value in root.values():
+                if isinstance(value, str) and value:
+                    return value
     return None
 
 
@@ -439,17 +575,31 @@ def _extract_seller_id(item: dict) -> str | None:
     return _extract_seller_slug(item)
 
 
+_BRANDS_RE = re.compile(r"/brands/([^/?#]+)")
+
+
 def _extract_seller_slug(item: dict) -> str | None:
-    try:
-        blob = json.dumps(item, ensure_ascii=True)
-    except Exception:
-        blob = str(item)
-    match = re.search(r"/brands/([^/?#]+)", blob)
-    if match:
-        return match.group(1)
+    # Ищем по строковым значениям с ранним выходом, без сериализации всего объявления.
+    for value in _iter_strings(item):
+        if "/brands/" not in value:
+            continue
+        match = _BRANDS_RE.search(value)
+        if match:
+            return match.group(1)
     return None
 
 
+def _iter_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for nested in value.values():
+            yield from _iter_strings(nested)
+    elif isinstance(value, list):
+        for nested in value:
+            yield from _iter_strings(nested)
+
+
 def _is_promotion(item: dict) -> bool | None:
     iva = item.get("iva") or {}
     steps = iva.get("DateInfoStep") if isinstance(iva, dict) else None
@@ -473,9 +623,23 @@ def _absolute_url(url: str) -> str:
     return f"https://www.avito.ru{url}" if url.startswith("/") else f"https://www.avito.ru/{url}"
 
 
+def _parse_retry_after(value: str | None) -> int | None:
+    if not value:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return None
+
+
 def _to_int(value: Any) -> int | None:
+    # Частые случаи без исключений: цена приходит числом или строкой из цифр.
     if value is None:
         return None
+    if type(value) is int:
+        return value
+    if isinstance(value, str) and value.isdecimal():
+        return int(value)
     try:
         return int(value)
     except (TypeError, ValueError):
@@ -486,56 +650,60 @@ def _to_datetime(timestamp_ms: Any) -> datetime | None:
     if not timestamp_ms:
         return None
     try:
-        return datetime.utcfromtimestamp(int(timestamp_ms) / 1000)
-    except (TypeError, ValueError):
+        # В БД время хранится naive UTC.
+        return datetime.fromtimestamp(int(timestamp_ms) / 1000, tz=timezone.utc).replace(tzinfo=None)
+    except (TypeError, ValueError, OverflowError, OSError):
         return None
 
 
-def _deep_get(obj: dict, keys: list[str]) -> Any:
-    current: Any = obj
-    for key in keys:
-        if not isinstance(current, dict):
-            return None
-        current = current.get(key)
-    return current
+def _nested_get(obj: dict, key: str, nested_key: str) -> Any:
+    # Все пути в объявлении двухуровневые: без списка ключей и цикла на каждый вызов.
+    value = obj.get(key)
+    return value.get(nested_key) if isinstance(value, dict) else None
 
 
 def _looks_blocked(text: str) -> bool:
     lower = text.lower()
-    return any(marker in lower for marker in BLOCK_MARKERS)
+    return any(marker in lower for marker in _BLOCK_MARKERS_LOWER)
 
 
 def _extract_views(html_code: str) -> tuple[int | None, int | None]:
-    soup = BeautifulSoup(html_code, "html.parser")
+    try:
+        tree = lxml_html.fromstring(html_code)
+    except (etree.ParserError, ValueError):
+        return None, None
 
-    def _digits(node) -> int | None:
-        if not node:
+    def _digits(marker: str) -> int | None:
+        nodes = _VIEWS_XPATH(tree, marker=marker)
+        if not nodes:
             return None
-        value = "".join(ch for ch in node.get_text() if ch.isdigit())
+        value = "".join(ch for ch in nodes[0].text_content() if ch.isdigit())
         return int(value) if value else None
 
-    total = _digits(soup.select_one('[data-marker="item-view/total-views"]'))
-    today = _digits(soup.select_one('[data-marker="item-view/today-views"]'))
-    return total, today
+    return _digits("item-view/total-views"), _digits("item-view/today-views")
 
 
-def _next_page_url(url: str) -> str | None:
+def _iter_page_urls(url: str) -> Iterator[str]:
+    # URL поиска разбираем один раз, дальше меняется только номер страницы p.
+    yield url
     try:
         parts = urlparse(url)
         query_params = parse_qs(parts.query)
         current_page = int(query_params.get("p", [1])[0])
-        query_params["p"] = [str(current_page + 1)]
-        new_query = urlencode(query_params, doseq=True)
-        return urlunparse((parts.scheme, parts.netloc, parts.path, parts.params, new_query, parts.fragment))
     except Exception:
         logger.debug("Failed to build next page url", exc_info=True)
-        return None
+        return
+    while True:
+        current_page += 1
+        query_params["p"] = [str(current_page)]
+        new_query = urlencode(query_params, doseq=True)
+        yield urlunparse((parts.scheme, parts.netloc, parts.path, parts.params, new_query, parts.fragment))
 
 
 def _load_cookies(path: str) -> dict[str, str]:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
         if isinstance(data, dict):
             return {str(k): str(v) for k, v in data.items()}
     except FileNotFoundError:
@@ -547,8 +715,8 @@ def _load_cookies(path: str) -> dict[str, str]:
 
 def _save_cookies(path: str, cookies: dict[str, str]) -> None:
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(cookies, f)
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(cookies))
     except Exception:
         logger.debug("Avito cookies write failed", exc_info=True)
 
@@ -13,6 +13,9 @@ class BaseFetcher(ABC):
     async def fetch(self, task=None, profile=None) -> list[Listing]:
         raise NotImplementedError
 
+    async def close(self) -> None:
+        pass
+
 
 class GlobalFetcher(BaseFetcher):
     is_global = True
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-import json
+import asyncio
 from pathlib import Path
 from typing import Any
 
+import orjson
+
 from dropwatch.common.types import Listing
 from dropwatch.monitor.fetchers.base import GlobalFetcher
 
@@ -11,28 +13,40 @@ from dropwatch.monitor.fetchers.base import GlobalFetcher
 class MockFetcher(GlobalFetcher):
     def __init__(self, data_path: str) -> None:
         self.data_path = Path(data_path)
+        self._cached: list[Listing] = []
+        self._cached_mtime_ns: int | None = None
 
     async def fetch_all(self) -> list[Listing]:
-        if not self.data_path.exists():
+        # Файл читаем в потоке и только если он изменился, иначе отдаем разобранный ранее список.
+        try:
+            mtime_ns = self.data_path.stat().st_mtime_ns
+        except FileNotFoundError:
             return []
-        raw = json.loads(self.data_path.read_text(encoding="utf-8"))
-        listings: list[Listing] = []
-        for item in raw:
-            listings.append(
-                Listing(
-                    listing_id=str(item.get("id") or item.get("listing_id") or item.get("url")),
-                    url=str(item.get("url") or ""),
-                    title=str(item.get("title") or "Без названия"),
-                    price=_to_int(item.get("price")),
-                    location=item.get("location"),
-                    published_at=None,
-                    image_url=item.get("image_url"),
-                    source="mock",
-                    description=item.get("description"),
-                    raw=item,
-                )
+        if mtime_ns != self._cached_mtime_ns:
+            raw = orjson.loads(await asyncio.to_thread(self.data_path.read_bytes))
+            self._cached = _to_listings(raw)
+            self._cached_mtime_ns = mtime_ns
+        return list(self._cached)
+
+
+def _to_listings(raw: list[dict]) -> list[Listing]:
+    listings: list[Listing] = []
+    for item in raw:
+        listings.append(
+            Listing(
+                listing_id=str(item.get("id") or item.get("listing_id") or item.get("url")),
+                url=str(item.get("url") or ""),
+                title=str(item.get("title") or "Без названия"),
+                price=_to_int(item.get("price")),
+                location=item.get("location"),
+                published_at=None,
+                image_url=item.get("image_url"),
+                source="mock",
+                description=item.get("description"),
+                raw=item,
             )
-        return listings
+        )
+    return listings
 
 
 def _to_int(value: Any) -> int | None:
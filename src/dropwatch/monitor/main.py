@@ -1,8 +1,9 @@
 import asyncio
 import logging
 import random
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
 from typing import Any, Awaitable, Callable
 
 from aiogram import Bot
@@ -19,9 +20,9 @@ from dropwatch.bot.keyboards import listing_actions_keyboard
 from dropwatch.bot.texts import NEW_DROP_HEADER
 from dropwatch.common.config import settings
 from dropwatch.common.formatting import build_listing_summary, format_listing_message
-from dropwatch.common.hash_utils import listing_hash
+from dropwatch.common.hash_utils import listing_hash, listing_hash_changed
 from dropwatch.common.logging import setup_logging
-from dropwatch.common.matching import matches_task
+from dropwatch.common.matching import filter_matching
 from dropwatch.common.secrets import decode_secret
 from dropwatch.common.single_tenant import ensure_owner_user, single_tenant_enabled
 from dropwatch.common.time_utils import is_quiet_hours
@@ -30,22 +31,49 @@ from dropwatch.db import crud
 from dropwatch.db.database import create_db, get_sessionmaker, init_engine
 from dropwatch.db.models import Task
 from dropwatch.monitor.fetchers.avito_search import AvitoRuntimeProfile, BlockedError, RateLimitError
+from dropwatch.monitor.fetchers.base import BaseFetcher
 from dropwatch.monitor.fetchers.factory import create_fetcher
+from dropwatch.monitor.notify_limit import NotificationRateLimiter
+from dropwatch.monitor.notify_log import NotificationLogger
+from dropwatch.monitor.notify_queue import NotificationJob, NotificationQueue
+from dropwatch.monitor.request_limit import TokenBucket
 
 
 logger = logging.getLogger("monitor")
 MAX_BACKOFF_SEC = 600
+NOTICE_REPEAT_SEC = 30 * 60
 TELEGRAM_CAPTION_LIMIT = 1024
 TELEGRAM_MESSAGE_LIMIT = 4096
+WORKER_RESTART_DELAY_SEC = 1.0
+FETCHER_IDLE_SEC = 30 * 60
 
 
 @dataclass
 class RateLimitState:
     backoff_sec: int
-    next_allowed_at: datetime
+    next_allowed_at: float
     success_streak: int = 0
 
 
+@dataclass
+class MonitorState:
+    rate_limits: dict[int, RateLimitState] = field(default_factory=dict)
+    # Сроки планировщика — секунды time.monotonic(): дешевле datetime/timedelta и не зависят от перевода часов.
+    blocked_until: dict[int, float] = field(default_factory=dict)
+    blocked_notified_until: dict[int, float] = field(default_factory=dict)
+    antiban_notified_until: dict[int, float] = field(default_factory=dict)
+    # Запросы к Avito идут строго по одному; темп — токен раз в min_request_gap_sec, запас до request_burst.
+    request_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    request_bucket: TokenBucket = field(
+        default_factory=lambda: TokenBucket(settings.request_burst, settings.min_request_gap_sec)
+    )
+    # Фетчер на пользователя живет между тиками (cookies, keep-alive); ключ — его антибан-профиль.
+    fetchers: dict[int, tuple[tuple, BaseFetcher]] = field(default_factory=dict)
+    fetcher_used_at: dict[int, float] = field(default_factory=dict)
+    # Замененные и простаивающие фетчеры закрываются в конце тика, когда их точно никто не использует.
+    retired_fetchers: list[BaseFetcher] = field(default_factory=list)
+
+
 def _build_fetch_profile(user_settings) -> AvitoRuntimeProfile:
     cookies_path_suffix = str(getattr(user_settings, "user_id", "default"))
     return AvitoRuntimeProfile(
@@ -75,6 +103,43 @@ def _price_drop_header(old_price: int | None, new_price: int | None) -> str:
     return f"Цена снизилась! Было {old_price} ₽ -> {new_price} ₽"
 
 
+def _seen_row(listing: Listing, content_hash: str, **keys) -> dict:
+    return {
+        **keys,
+        "last_price": listing.price,
+        "last_title": listing.title,
+        "last_url": listing.url,
+        "last_location": listing.location,
+        "last_hash": content_hash,
+    }
+
+
+def _feed_task_key(task: Task, feed_fingerprint: int) -> tuple:
+    # Все, от чего зависит результат _process_task на общей ленте: сама лента, версия радара (updated_at двигают
+    # правки фильтров и очистка истории, но не отметки проверки), настройки и события пользователя.
+    # Пока ключ не менялся, повторная обработка ничего нового не найдет.
+    user = task.user
+    user_settings = user.settings if user else None
+    return (
+        feed_fingerprint,
+        task.updated_at,
+        user_settings.updated_at if user_settings else None,
+        (user.event_new, user.event_price_drop, user.event_update) if user else None,
+    )
+
+
+def _views_line(today: int | None, total: int | None) -> str | None:
+    match today, total:
+        case None, None:
+            return None
+        case None, _:
+            return f"👀 {total} всего"
+        case _, None:
+            return f"👀 {today} сегодня"
+        case _:
+            return f"👀 {today} сегодня / {total} всего"
+
+
 def _truncate_telegram_text(text: str, limit: int) -> str:
     if len(text) <= limit:
         return text
@@ -136,13 +201,9 @@ async def _send_notification(
     summary = build_listing_summary(listing)
     if summary:
         extra_lines.append(f"📝 {summary}")
-    if listing.total_views is not None or listing.today_views is not None:
-        if listing.total_views is not None and listing.today_views is not None:
-            extra_lines.append(f"👀 {listing.today_views} сегодня / {listing.total_views} всего")
-        elif listing.total_views is not None:
-            extra_lines.append(f"👀 {listing.total_views} всего")
-        else:
-            extra_lines.append(f"👀 {listing.today_views} сегодня")
+    views = _views_line(listing.today_views, listing.total_views)
+    if views:
+        extra_lines.append(views)
 
     message = format_listing_message(
         task.name,
@@ -185,18 +246,31 @@ async def _send_notification(
     return sent
 
 
+async def _deliver_notification(bot: Bot, job: NotificationJob) -> bool:
+    if job.listing is None:
+        return await _send_telegram_request(
+            f"send_aggregate_notice user_id={job.chat_id} task_id={job.task.id}",
+            lambda: bot.send_message(chat_id=job.chat_id, text=job.text),
+        )
+    return await _send_notification(bot, job.chat_id, job.task, job.listing, job.text)
+
+
 async def _process_task(
     session,
-    bot: Bot,
     task: Task,
     listings: list[Listing],
+    notify_limiter: NotificationRateLimiter,
+    notify_queue: NotificationQueue,
+    user_settings=None,
+    precomputed_hashes: dict[int, str] | None = None,
 ) -> None:
-    user = await crud.get_user(session, task.user_id)
+    # user и settings уже подгружены list_due_tasks; настройки, созданные вызывающим, приходят аргументом.
+    user = task.user
     if not user:
         logger.warning("Task user missing: task_id=%s", task.id)
         return
 
-    user_settings = await crud.get_or_create_settings(
+    user_settings = user_settings or user.settings or await crud.get_or_create_settings(
         session,
         user_id=user.id,
         default_interval=user.default_interval_sec,
@@ -217,47 +291,53 @@ async def _process_task(
         len(listings),
     )
 
-    remaining_limit = None
     if user.notify_limit_per_hour is not None:
-        sent_count = await crud.notification_count_last_hour(session, user.id)
-        remaining_limit = max(0, user.notify_limit_per_hour - sent_count)
+        if not notify_limiter.is_seeded(user.id):
+            notify_limiter.seed(user.id, await crud.notification_times_last_hour(session, user.id))
+        sent_count = notify_limiter.count(user.id)
         logger.info(
             "Notify limit: user_id=%s sent_last_hour=%s remaining=%s",
             user.id,
             sent_count,
-            remaining_limit,
+            max(0, user.notify_limit_per_hour - sent_count),
         )
 
     notifications: list[tuple[Listing, str]] = []
-    matched = 0
-    skipped = 0
-
-    for listing in listings:
-        if not matches_task(task, listing, monitor_settings=user_settings):
-            skipped += 1
+    matched_listings = filter_matching(task, listings, monitor_settings=user_settings)
+    matched = len(matched_listings)
+    skipped = len(listings) - matched
+    seen_map = await crud.get_seen_listings_map(
+        session, task.id, (listing.listing_id for listing in matched_listings)
+    )
+    handled: set[str] = set()
+    new_seen: list[dict] = []
+    seen_updates: list[dict] = []
+    # Уже виденные — основная масса выдачи: уровень лога проверяем один раз на задачу, а не на каждое объявление.
+    log_seen = logger.isEnabledFor(logging.INFO)
+
+    for listing in matched_listings:
+        # Повтор id в одной выдаче: карта seen уже неактуальна, второй раз не обрабатываем.
+        if listing.listing_id in handled:
             continue
-        matched += 1
-
-        content_hash = listing_hash(listing.title, listing.price, listing.location, listing.url)
-        seen = await crud.get_seen_listing(session, task.id, listing.listing_id)
+        handled.add(listing.listing_id)
+        content_hash = precomputed_hashes.get(id(listing)) if precomputed_hashes else None
+        if content_hash is None:
+            content_hash = listing_hash(listing.title, listing.price, listing.location, listing.url)
+        seen = seen_map.get(listing.listing_id)
 
         if seen:
-            logger.info(
-                "Seen listing: task_id=%s listing_id=%s muted=%s",
-                task.id,
-                listing.listing_id,
-                seen.is_muted,
-            )
-            if seen.is_muted:
-                await crud.update_seen_listing(
-                    session,
-                    seen.id,
-                    listing.price,
-                    listing.title,
-                    listing.url,
-                    listing.location,
-                    content_hash,
+            if log_seen:
+                logger.info(
+                    "Seen listing: task_id=%s listing_id=%s muted=%s",
+                    task.id,
+                    listing.listing_id,
+                    seen.is_muted,
                 )
+            # Хэш покрывает все last_*-поля: совпал — цена и текст те же, ни уведомления, ни UPDATE не нужны.
+            if seen.last_hash == content_hash:
+                continue
+            if seen.is_muted:
+                seen_updates.append(_seen_row(listing, content_hash, b_id=seen.id))
                 continue
 
             price_drop = (
@@ -266,7 +346,7 @@ async def _process_task(
                 and seen.last_price is not None
                 and listing.price < seen.last_price
             )
-            updated = user.event_update and content_hash != seen.last_hash
+            updated = user.event_update and listing_hash_changed(content_hash, seen.last_hash)
 
             if price_drop:
                 logger.info(
@@ -281,57 +361,260 @@ async def _process_task(
                 logger.info("Update detected: task_id=%s listing_id=%s", task.id, listing.listing_id)
                 notifications.append((listing, "Объявление обновилось!"))
 
-            await crud.update_seen_listing(
-                session,
-                seen.id,
-                listing.price,
-                listing.title,
-                listing.url,
-                listing.location,
-                content_hash,
-            )
+            seen_updates.append(_seen_row(listing, content_hash, b_id=seen.id))
             continue
 
         if user.event_new and not first_run:
             notifications.append((listing, NEW_DROP_HEADER))
 
-        await crud.add_seen_listing(
-            session,
-            task.id,
-            listing.listing_id,
-            listing.price,
-            listing.title,
-            listing.url,
-            listing.location,
-            content_hash,
-        )
+        new_seen.append(_seen_row(listing, content_hash, listing_id=listing.listing_id))
+
+    await crud.bulk_update_seen_listings(session, seen_updates)
+    await crud.bulk_add_seen_listings(session, task.id, new_seen)
+    # Фиксируем seen до отправки: сбой на уведомлениях не должен приводить к повторной рассылке.
+    await session.commit()
 
     if not notifications:
         logger.info("No notifications: task_id=%s matched=%s skipped=%s", task.id, matched, skipped)
         return
 
-    if not quiet_mode and len(notifications) >= settings.aggregate_threshold:
+    if quiet_mode:
+        for listing, _ in notifications:
+            logger.info("Skip notify (quiet hours): task_id=%s listing_id=%s", task.id, listing.listing_id)
+        return
+
+    # Отправка идет в фоне через очередь; лимит в час проверяется уже при отправке.
+    if len(notifications) >= settings.aggregate_threshold:
         logger.info("Aggregate notice: task_id=%s count=%s", task.id, len(notifications))
-        await _send_telegram_request(
-            f"send_aggregate_notice user_id={user.tg_id} task_id={task.id}",
-            lambda: bot.send_message(
+        notify_queue.put(
+            NotificationJob(
                 chat_id=user.tg_id,
+                user_id=user.id,
+                task=task,
+                listing=None,
                 text=f"Нашёл {len(notifications)} новых объявлений по радару {task.name}",
-            ),
+            )
         )
-
     for listing, header in notifications:
-        if quiet_mode:
-            logger.info("Skip notify (quiet hours): task_id=%s listing_id=%s", task.id, listing.listing_id)
-            continue
-        if remaining_limit is not None and remaining_limit <= 0:
-            logger.info("Skip notify (limit): task_id=%s listing_id=%s", task.id, listing.listing_id)
-            continue
-        sent = await _send_notification(bot, user.tg_id, task, listing, header)
-        if sent:
-            await crud.log_notification(session, user.id)
-            if remaining_limit is not None:
-                remaining_limit -= 1
+        notify_queue.put(
+            NotificationJob(
+                chat_id=user.tg_id,
+                user_id=user.id,
+                task=task,
+                listing=listing,
+                text=header,
+                limit_per_hour=user.notify_limit_per_hour,
+            )
+        )
+
+
+def _get_fetcher(state: MonitorState, user_id: int, profile: AvitoRuntimeProfile) -> BaseFetcher:
+    # Без await между проверкой и записью: параллельные задачи пользователя получают один и тот же фетчер.
+    key = (profile.proxy, profile.proxy_change_url, profile.cookies_api_key, profile.cookies_path)
+    state.fetcher_used_at[user_id] = time.monotonic()
+    cached = state.fetchers.get(user_id)
+    if cached and cached[0] == key:
+        return cached[1]
+    if cached:
+        # Профиль сменился (новый прокси или ключ): старым фетчером может еще идти задача этого тика.
+        state.retired_fetchers.append(cached[1])
+    fetcher = create_fetcher(profile=profile)
+    state.fetchers[user_id] = (key, fetcher)
+    return fetcher
+
+
+async def _release_fetchers(state: MonitorState) -> None:
+    # Вызывается между тиками: фетчеры пользователей без задач за FETCHER_IDLE_SEC закрываем вместе с замененными.
+    retired, state.retired_fetchers = state.retired_fetchers, []
+    cutoff = time.monotonic() - FETCHER_IDLE_SEC
+    for user_id, used_at in list(state.fetcher_used_at.items()):
+        if used_at < cutoff:
+            del state.fetcher_used_at[user_id]
+            cached = state.fetchers.pop(user_id, None)
+            if cached:
+                retired.append(cached[1])
+    for fetcher in retired:
+        try:
+            await fetcher.close()
+        except Exception:
+            logger.warning("Fetcher close failed", exc_info=True)
+
+
+async def _run_fetch_task(
+    session_maker,
+    bot: Bot,
+    task: Task,
+    state: MonitorState,
+    semaphore: asyncio.BoundedSemaphore,
+    notify_limiter: NotificationRateLimiter,
+    notify_queue: NotificationQueue,
+) -> None:
+    # Задачи тика выполняются параллельно (не больше fetch_concurrency), у каждой своя сессия и транзакция.
+    async with semaphore, session_maker() as session:
+        mono_now = time.monotonic()
+        user = None
+        try:
+            user = task.user
+            if not user:
+                logger.warning("Skip task without user: task_id=%s", task.id)
+                return
+
+            user_settings = user.settings or await crud.get_or_create_settings(
+                session,
+                user_id=user.id,
+                default_interval=user.default_interval_sec,
+            )
+            if not user_settings.monitor_enabled:
+                logger.info("Monitor disabled for user_id=%s task_id=%s", user.id, task.id)
+                await crud.touch_task(session, task.id, datetime.utcnow())
+                return
+
+            profile = _build_fetch_profile(user_settings)
+            missing_antiban = _missing_antiban_for_profile(profile)
+            if missing_antiban:
+                notify_until = state.antiban_notified_until.get(user.id)
+                if not notify_until or mono_now >= notify_until:
+                    # Отметку ставим до отправки: параллельные задачи того же пользователя не дублируют уведомление.
+                    state.antiban_notified_until[user.id] = mono_now + NOTICE_REPEAT_SEC
+                    await _send_telegram_request(
+                        f"send_antiban_notice user_id={user.tg_id} task_id={task.id}",
+                        lambda: bot.send_message(
+                            chat_id=user.tg_id,
+                            text=(
+                                "Мониторинг приостановлен: не заполнен обязательный антибан.\n"
+                                f"Заполни команды: {' '.join(missing_antiban)}"
+                            ),
+                        ),
+                    )
+                await crud.touch_task(session, task.id, datetime.utcnow())
+                return
+
+            block_until = state.blocked_until.get(task.id)
+            if block_until and mono_now < block_until:
+                wait_sec = int(block_until - mono_now)
+                logger.info("Blocked cooldown: task_id=%s wait_sec=%s", task.id, wait_sec)
+                return
+
+            rl_state = state.rate_limits.get(task.id)
+            if rl_state and mono_now < rl_state.next_allowed_at:
+                wait_sec = int(rl_state.next_allowed_at - mono_now)
+                logger.info(
+                    "Rate limit active: task_id=%s wait_sec=%s backoff=%s",
+                    task.id,
+                    wait_sec,
+                    rl_state.backoff_sec,
+                )
+                return
+
+            fetcher = _get_fetcher(state, user.id, profile)
+            try:
+                async with state.request_lock:
+                    waited_sec = await state.request_bucket.acquire()
+                    if waited_sec:
+                        logger.info("Global throttle: waited %.1fs", waited_sec)
+                    mono_now = time.monotonic()
+                    logger.info("Task fetch start: task_id=%s url=%s", task.id, task.search_url)
+                    try:
+                        listings = await fetcher.fetch(task=task)
+                    finally:
+                        state.request_bucket.done()
+            except RateLimitError as exc:
+                base = max(30, task.interval_sec)
+                prev = state.rate_limits.get(task.id)
+                if prev:
+                    backoff = min(MAX_BACKOFF_SEC, max(base, prev.backoff_sec * 2))
+                else:
+                    backoff = min(MAX_BACKOFF_SEC, base * 2)
+                if exc.retry_after:
+                    backoff = max(backoff, exc.retry_after)
+                jitter = random.uniform(1.0, max(2.0, backoff / 4))
+                next_allowed = mono_now + backoff + jitter
+                state.rate_limits[task.id] = RateLimitState(
+                    backoff_sec=backoff,
+                    next_allowed_at=next_allowed,
+                    success_streak=0,
+                )
+                logger.warning(
+                    "Rate limited: task_id=%s backoff=%s retry_after=%s",
+                    task.id,
+                    backoff,
+                    exc.retry_after,
+                )
+                return
+            except BlockedError:
+                cooldown_sec = max(300, task.interval_sec * 4)
+                state.blocked_until[task.id] = mono_now + cooldown_sec
+                notify_until = state.blocked_notified_until.get(task.id)
+                if not notify_until or mono_now >= notify_until:
+                    state.blocked_notified_until[task.id] = mono_now + NOTICE_REPEAT_SEC
+                    await _send_telegram_request(
+                        f"send_blocked_notice user_id={user.tg_id} task_id={task.id}",
+                        lambda: bot.send_message(
+                            chat_id=user.tg_id,
+                            text=(
+                                "Avito ограничил доступ (бан/капча). "
+                                "Проверь /set_proxy и /set_proxy_change_url."
+                            ),
+                        ),
+                    )
+                logger.warning("Blocked: task_id=%s cooldown=%s", task.id, cooldown_sec)
+                return
+
+            logger.info("Task fetch done: task_id=%s listings=%s", task.id, len(listings))
+            rl_state = state.rate_limits.get(task.id)
+            if rl_state:
+                rl_state.success_streak += 1
+                if rl_state.success_streak >= 3:
+                    base = max(30, task.interval_sec)
+                    new_backoff = max(base, rl_state.backoff_sec // 2)
+                    if new_backoff <= base:
+                        state.rate_limits.pop(task.id, None)
+                        logger.info("Rate limit cleared: task_id=%s", task.id)
+                    else:
+                        rl_state.backoff_sec = new_backoff
+                        rl_state.next_allowed_at = mono_now + new_backoff
+                        rl_state.success_streak = 0
+                        logger.info(
+                            "Rate limit reduced: task_id=%s backoff=%s",
+                            task.id,
+                            new_backoff,
+                        )
+
+            await _process_task(session, task, listings, notify_limiter, notify_queue, user_settings=user_settings)
+            await crud.touch_task(session, task.id, datetime.utcnow())
+        except Exception:
+            logger.exception("Task loop failed: task_id=%s", task.id)
+            await crud.touch_task(session, task.id, datetime.utcnow())
+        finally:
+            # crud не коммитит: одна транзакция на задачу.
+            await session.commit()
+
+
+def _start_worker(workers: dict[str, asyncio.Task], name: str, run: Callable[[], Awaitable[None]]) -> None:
+    # Фоновый воркер не должен умирать молча: падение логируем и через паузу поднимаем заново.
+    # Запись в workers — признак, что воркер нужен; на остановке словарь очищается до отмены задач.
+    worker = asyncio.create_task(run(), name=name)
+    workers[name] = worker
+
+    def _restart() -> None:
+        if name in workers:
+            _start_worker(workers, name, run)
+
+    def _on_done(done: asyncio.Task) -> None:
+        if done.cancelled() or workers.get(name) is not done:
+            return
+        logger.error("Worker stopped, restarting: %s", name, exc_info=done.exception())
+        asyncio.get_running_loop().call_later(WORKER_RESTART_DELAY_SEC, _restart)
+
+    worker.add_done_callback(_on_done)
+
+
+async def _stop_workers(workers: dict[str, asyncio.Task]) -> None:
+    running = list(workers.values())
+    workers.clear()
+    for worker in running:
+        worker.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
 
 
 async def main() -> None:
@@ -347,190 +630,106 @@ async def main() -> None:
     if single_tenant_enabled():
         logger.info("Single-tenant mode enabled: owner_tg_id=%s", settings.owner_tg_id)
 
-    last_global_fetch: datetime | None = None
-    rate_limits: dict[int, RateLimitState] = {}
-    blocked_until: dict[int, datetime] = {}
-    blocked_notified_until: dict[int, datetime] = {}
-    antiban_notified_until: dict[int, datetime] = {}
-    last_request_at: datetime | None = None
-
-    while True:
-        now = datetime.utcnow()
-        try:
-            async with session_maker() as session:
-                due_tasks = await crud.list_due_tasks(session, now, owner_tg_id=settings.owner_tg_id)
-                if not due_tasks:
-                    logger.info("No due tasks")
-                    await asyncio.sleep(settings.scheduler_tick_sec)
-                    continue
-
-                if bootstrap_fetcher.is_global:
-                    listings: list[Listing] = []
-                    if not last_global_fetch or now - last_global_fetch >= timedelta(seconds=settings.global_poll_interval_sec):
-                        logger.info("Global fetch start")
-                        try:
-                            listings = await bootstrap_fetcher.fetch()
-                        except Exception:
-                            logger.exception("Global fetch failed")
-                            await asyncio.sleep(settings.scheduler_tick_sec)
-                            continue
-                        logger.info("Global fetch done: listings=%s", len(listings))
-                        last_global_fetch = datetime.utcnow()
-                    else:
-                        logger.info("Global fetch skipped (interval)")
+    last_global_fetch: float | None = None
+    processed_feeds: dict[int, tuple] = {}
+    state = MonitorState()
+    semaphore = asyncio.BoundedSemaphore(max(1, settings.fetch_concurrency))
+    notify_limiter = NotificationRateLimiter()
+    notify_log = NotificationLogger()
+    notify_queue = NotificationQueue(lambda job: _deliver_notification(bot, job), notify_limiter, notify_log)
+    workers: dict[str, asyncio.Task] = {}
+    _start_worker(workers, "notify_log", notify_log.run)
+    _start_worker(workers, "notify_queue", notify_queue.run)
+
+    try:
+        while True:
+            now = datetime.utcnow()
+            try:
+                await _release_fetchers(state)
+                async with session_maker() as session:
+                    due_tasks = await crud.list_due_tasks(
+                        session, now, owner_tg_id=settings.owner_tg_id, limit=settings.tick_batch_size
+                    )
+                    if not due_tasks:
+                        logger.info("No due tasks")
                         await asyncio.sleep(settings.scheduler_tick_sec)
                         continue
 
-                    for task in due_tasks:
-                        touched_at = datetime.utcnow()
-                        try:
-                            await _process_task(session, bot, task, listings)
-                        except Exception:
-                            logger.exception("Task processing failed: task_id=%s", task.id)
-                        finally:
-                            await crud.touch_task(session, task.id, touched_at)
-                else:
-                    for task in due_tasks:
-                        task_now = datetime.utcnow()
-                        user = None
-                        try:
-                            user = await crud.get_user(session, task.user_id)
-                            if not user:
-                                logger.warning("Skip task without user: task_id=%s", task.id)
-                                continue
-
-                            user_settings = await crud.get_or_create_settings(
-                                session,
-                                user_id=user.id,
-                                default_interval=user.default_interval_sec,
-                            )
-                            if not user_settings.monitor_enabled:
-                                logger.info("Monitor disabled for user_id=%s task_id=%s", user.id, task.id)
-                                await crud.touch_task(session, task.id, task_now)
-                                continue
-
-                            profile = _build_fetch_profile(user_settings)
-                            missing_antiban = _missing_antiban_for_profile(profile)
-                            if missing_antiban:
-                                notify_until = antiban_notified_until.get(user.id)
-                                if not notify_until or task_now >= notify_until:
-                                    await _send_telegram_request(
-                                        f"send_antiban_notice user_id={user.tg_id} task_id={task.id}",
-                                        lambda: bot.send_message(
-                                            chat_id=user.tg_id,
-                                            text=(
-                                                "Мониторинг приостановлен: не заполнен обязательный антибан.\n"
-                                                f"Заполни команды: {' '.join(missing_antiban)}"
-                                            ),
-                                        ),
-                                    )
-                                    antiban_notified_until[user.id] = task_now + timedelta(minutes=30)
-                                await crud.touch_task(session, task.id, task_now)
-                                continue
-
-                            fetcher = create_fetcher(profile=profile)
-
-                            if last_request_at:
-                                delta = task_now - last_request_at
-                                if delta < timedelta(seconds=settings.min_request_gap_sec):
-                                    wait_sec = (timedelta(seconds=settings.min_request_gap_sec) - delta).total_seconds()
-                                    logger.info("Global throttle: sleep %.1fs", wait_sec)
-                                    await asyncio.sleep(wait_sec)
-                                    task_now = datetime.utcnow()
-
-                            block_until = blocked_until.get(task.id)
-                            if block_until and task_now < block_until:
-                                wait_sec = int((block_until - task_now).total_seconds())
-                                logger.info("Blocked cooldown: task_id=%s wait_sec=%s", task.id, wait_sec)
+                    if bootstrap_fetcher.is_global:
+                        listings: list[Listing] = []
+                        poll_due = time.monotonic() - (last_global_fetch or 0.0) >= settings.global_poll_interval_sec
+                        if not last_global_fetch or poll_due:
+                            logger.info("Global fetch start")
+                            try:
+                                listings = await bootstrap_fetcher.fetch()
+                            except Exception:
+                                logger.exception("Global fetch failed")
+                                await asyncio.sleep(settings.scheduler_tick_sec)
                                 continue
+                            logger.info("Global fetch done: listings=%s", len(listings))
+                            last_global_fetch = time.monotonic()
+                        else:
+                            logger.info("Global fetch skipped (interval)")
+                            await asyncio.sleep(settings.scheduler_tick_sec)
+                            continue
 
-                            rl_state = rate_limits.get(task.id)
-                            if rl_state and task_now < rl_state.next_allowed_at:
-                                wait_sec = int((rl_state.next_allowed_at - task_now).total_seconds())
-                                logger.info(
-                                    "Rate limit active: task_id=%s wait_sec=%s backoff=%s",
-                                    task.id,
-                                    wait_sec,
-                                    rl_state.backoff_sec,
-                                )
+                        # Забираем задачи тем же коммитом, что снимает блокировки SELECT ... FOR UPDATE.
+                        # Это и есть отметка проверки на тик: один UPDATE на все задачи общей ленты.
+                        await crud.claim_tasks(session, [task.id for task in due_tasks], datetime.utcnow())
+                        await session.commit()
+                        # Лента общая для всех задач: хэши считаем один раз, а не на каждую пару задача-объявление.
+                        # Ключ — id() объекта, а не listing_id: в ленте бывают повторы id с разным содержимым.
+                        hashes = {
+                            id(listing): listing_hash(listing.title, listing.price, listing.location, listing.url)
+                            for listing in listings
+                        }
+                        # Отпечаток ленты по содержимому и порядку: та же лента дает тот же результат.
+                        feed_fingerprint = hash(tuple(hashes.values()))
+                        unchanged = 0
+                        for task in due_tasks:
+                            feed_key = _feed_task_key(task, feed_fingerprint)
+                            if processed_feeds.get(task.id) == feed_key:
+                                unchanged += 1
                                 continue
-
-                            logger.info("Task fetch start: task_id=%s url=%s", task.id, task.search_url)
                             try:
-                                listings = await fetcher.fetch(task=task)
-                                last_request_at = datetime.utcnow()
-                            except RateLimitError as exc:
-                                base = max(30, task.interval_sec)
-                                prev = rate_limits.get(task.id)
-                                if prev:
-                                    backoff = min(MAX_BACKOFF_SEC, max(base, prev.backoff_sec * 2))
-                                else:
-                                    backoff = min(MAX_BACKOFF_SEC, base * 2)
-                                if exc.retry_after:
-                                    backoff = max(backoff, exc.retry_after)
-                                jitter = random.randint(1, max(2, backoff // 4))
-                                next_allowed = task_now + timedelta(seconds=backoff + jitter)
-                                rate_limits[task.id] = RateLimitState(
-                                    backoff_sec=backoff,
-                                    next_allowed_at=next_allowed,
-                                    success_streak=0,
-                                )
-                                logger.warning(
-                                    "Rate limited: task_id=%s backoff=%s retry_after=%s",
-                                    task.id,
-                                    backoff,
-                                    exc.retry_after,
+                                await _process_task(
+                                    session, task, listings, notify_limiter, notify_queue, precomputed_hashes=hashes
                                 )
+                            except Exception:
+                                logger.exception("Task processing failed: task_id=%s", task.id)
                                 continue
-                            except BlockedError:
-                                cooldown_sec = max(300, task.interval_sec * 4)
-                                blocked_until[task.id] = task_now + timedelta(seconds=cooldown_sec)
-                                notify_until = blocked_notified_until.get(task.id)
-                                if not notify_until or task_now >= notify_until:
-                                    await _send_telegram_request(
-                                        f"send_blocked_notice user_id={user.tg_id} task_id={task.id}",
-                                        lambda: bot.send_message(
-                                            chat_id=user.tg_id,
-                                            text=(
-                                                "Avito ограничил доступ (бан/капча). "
-                                                "Проверь /set_proxy и /set_proxy_change_url."
-                                            ),
-                                        ),
-                                    )
-                                    blocked_notified_until[task.id] = task_now + timedelta(minutes=30)
-                                logger.warning("Blocked: task_id=%s cooldown=%s", task.id, cooldown_sec)
-                                continue
-
-                            logger.info("Task fetch done: task_id=%s listings=%s", task.id, len(listings))
-                            rl_state = rate_limits.get(task.id)
-                            if rl_state:
-                                rl_state.success_streak += 1
-                                if rl_state.success_streak >= 3:
-                                    base = max(30, task.interval_sec)
-                                    new_backoff = max(base, rl_state.backoff_sec // 2)
-                                    if new_backoff <= base:
-                                        rate_limits.pop(task.id, None)
-                                        logger.info("Rate limit cleared: task_id=%s", task.id)
-                                    else:
-                                        rl_state.backoff_sec = new_backoff
-                                        rl_state.next_allowed_at = task_now + timedelta(seconds=new_backoff)
-                                        rl_state.success_streak = 0
-                                        logger.info(
-                                            "Rate limit reduced: task_id=%s backoff=%s",
-                                            task.id,
-                                            new_backoff,
-                                        )
-
-                            await _process_task(session, bot, task, listings)
-                            await crud.touch_task(session, task.id, datetime.utcnow())
-                        except Exception:
-                            logger.exception("Task loop failed: task_id=%s", task.id)
-                            await crud.touch_task(session, task.id, datetime.utcnow())
-                            continue
-        except Exception:
-            logger.exception("Monitor loop iteration failed")
-
-        await asyncio.sleep(settings.scheduler_tick_sec)
+                            processed_feeds[task.id] = feed_key
+                        if unchanged:
+                            logger.info("Feed unchanged: skipped tasks=%s", unchanged)
+                        # Держим только задачи этого тика: удаленные и остановленные не копятся в памяти.
+                        processed_feeds = {
+                            task.id: processed_feeds[task.id] for task in due_tasks if task.id in processed_feeds
+                        }
+                        await session.commit()
+                    else:
+                        # Задачи забираем и отпускаем соединение; дальше они идут в своих сессиях,
+                        # загруженные объекты остаются в памяти.
+                        await crud.claim_tasks(session, [task.id for task in due_tasks], datetime.utcnow())
+                        await session.commit()
+                        await session.close()
+                        jobs = [
+                            _run_fetch_task(session_maker, bot, task, state, semaphore, notify_limiter, notify_queue)
+                            for task in due_tasks
+                        ]
+                        for task, result in zip(due_tasks, await asyncio.gather(*jobs, return_exceptions=True)):
+                            if isinstance(result, BaseException):
+                                logger.error("Task job failed: task_id=%s", task.id, exc_info=result)
+            except Exception:
+                logger.exception("Monitor loop iteration failed")
+
+            await asyncio.sleep(settings.scheduler_tick_sec)
+    finally:
+        await _stop_workers(workers)
+        # Сессии curl и клиенты ротации IP закрываем явно: иначе соединения висят до сборки мусора.
+        state.retired_fetchers.extend(fetcher for _, fetcher in state.fetchers.values())
+        state.fetchers.clear()
+        await _release_fetchers(state)
+        await bootstrap_fetcher.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime, timezone
+import time
+from typing import Iterable
+
+
+class NotificationRateLimiter:
+    # Скользящее окно отправок по пользователю в памяти вместо COUNT(*) по notification_log на каждую задачу.
+    # Окно пользователя заполняется из БД один раз (seed), дальше ведется только в памяти.
+
+    def __init__(self, window_sec: float = 3600.0) -> None:
+        self._window_sec = window_sec
+        self._sent: dict[int, deque[float]] = {}
+
+    def is_seeded(self, user_id: int) -> bool:
+        return user_id in self._sent
+
+    def seed(self, user_id: int, sent_at: Iterable[datetime]) -> None:
+        # Время в БД — naive UTC.
+        self._sent[user_id] = deque(sorted(item.replace(tzinfo=timezone.utc).timestamp() for item in sent_at))
+
+    def record(self, user_id: int) -> None:
+        # Незасеянное окно не трогаем: при seed оно целиком придет из БД, иначе отправка посчиталась бы дважды.
+        sent = self._sent.get(user_id)
+        if sent is not None:
+            sent.append(time.time())
+
+    def count(self, user_id: int) -> int:
+        sent = self._sent.get(user_id)
+        if not sent:
+            return 0
+        cutoff = time.time() - self._window_sec
+        while sent and sent[0] < cutoff:
+            sent.popleft()
+        return len(sent)
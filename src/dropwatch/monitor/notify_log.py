@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+import logging
+
+from dropwatch.db import crud
+from dropwatch.db.database import unit_of_work
+
+
+logger = logging.getLogger("monitor")
+
+
+class NotificationLogger:
+    # Журнал отправок пишется пачками в фоне: одна транзакция на интервал вместо коммита на каждое уведомление.
+
+    def __init__(self, interval_sec: float = 0.5, max_batch: int = 500, max_queue: int = 10_000) -> None:
+        self._interval_sec = interval_sec
+        self._max_batch = max_batch
+        self._queue: asyncio.Queue[tuple[int, datetime]] = asyncio.Queue(maxsize=max_queue)
+
+    def log(self, user_id: int) -> None:
+        try:
+            self._queue.put_nowait((user_id, datetime.utcnow()))
+        except asyncio.QueueFull:
+            # Журнал только для аудита: лимит отправок считается в памяти, поэтому запись можно потерять.
+            logger.warning("Notification log queue full: drop user_id=%s", user_id)
+
+    async def run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self._interval_sec)
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                async with unit_of_work() as session:
+                    await crud.bulk_log_notifications(session, batch)
+            except Exception:
+                logger.exception("Notification log write failed: rows=%s", len(batch))
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import logging
+from typing import Awaitable, Callable
+
+from dropwatch.common.types import Listing
+from dropwatch.db.models import Task
+from dropwatch.monitor.notify_limit import NotificationRateLimiter
+from dropwatch.monitor.notify_log import NotificationLogger
+
+
+logger = logging.getLogger("monitor")
+
+
+@dataclass(slots=True)
+class NotificationJob:
+    chat_id: int
+    user_id: int
+    task: Task
+    # listing=None — служебное текстовое сообщение (сводка), в лимит и журнал не идет.
+    listing: Listing | None
+    text: str
+    limit_per_hour: int | None = None
+
+
+class NotificationQueue:
+    # Все уведомления уходят через один воркер: задачи мониторинга не ждут Telegram,
+    # а пауза на 429 (retry_after) притормаживает всю очередь, а не одну задачу.
+
+    def __init__(
+        self,
+        send: Callable[[NotificationJob], Awaitable[bool]],
+        limiter: NotificationRateLimiter,
+        notify_log: NotificationLogger,
+        interval_sec: float = 0.05,
+    ) -> None:
+        self._send = send
+        self._limiter = limiter
+        self._notify_log = notify_log
+        self._interval_sec = interval_sec
+        self._queue: asyncio.Queue[NotificationJob] = asyncio.Queue()
+
+    def put(self, job: NotificationJob) -> None:
+        self._queue.put_nowait(job)
+
+    async def run(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            except Exception:
+                logger.exception("Notification delivery failed: task_id=%s", job.task.id)
+            if self._interval_sec:
+                await asyncio.sleep(self._interval_sec)
+
+    async def _deliver(self, job: NotificationJob) -> None:
+        if job.listing is None:
+            await self._send(job)
+            return
+        # Лимит проверяем в момент отправки: между постановкой и отправкой могли уйти другие уведомления.
+        if job.limit_per_hour is not None and self._limiter.count(job.user_id) >= job.limit_per_hour:
+            logger.info("Skip notify (limit): task_id=%s listing_id=%s", job.task.id, job.listing.listing_id)
+            return
+        if await self._send(job):
+            self._notify_log.log(job.user_id)
+            self._limiter.record(job.user_id)
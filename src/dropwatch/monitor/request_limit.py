@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    # Один токен на запрос к Avito, токены копятся раз в interval_sec до capacity.
+    # capacity=1 — прежняя жесткая пауза; больше — после простоя можно сделать несколько запросов подряд.
+    # Вызывающий сериализует acquire()/done() сам (request_lock монитора).
+
+    def __init__(self, capacity: int, interval_sec: float) -> None:
+        self._capacity = float(max(1, capacity))
+        self._interval_sec = interval_sec
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+
+    async def acquire(self) -> float:
+        # Возвращает, сколько секунд пришлось ждать токен.
+        if self._interval_sec <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) / self._interval_sec)
+        self._updated_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        wait_sec = (1 - self._tokens) * self._interval_sec
+        await asyncio.sleep(wait_sec)
+        # За время сна накопился ровно недостающий токен, он же и тратится.
+        self._tokens = 0.0
+        self._updated_at = time.monotonic()
+        return wait_sec
+
+    def done(self) -> None:
+        # Пока идет запрос, токены не копятся: пауза до следующего считается от конца предыдущего, как раньше.
+        self._updated_at = time.monotonic()